@@ -18,3 +18,17 @@ def make_env(n=1000):
     a = rng.rand(n, 2)
     b = rng.rand(n, 2)
     return (a, b), {}
+
+
+# Geometric range of problem sizes used by ``run_benchmarks.py --sweep``
+sweep_sizes = (100, 300, 1000, 3000, 10000)
+
+
+def make_sweep_env(size):
+    """Build the environment of a problem with ``size`` points in a and b."""
+    return make_env(n=size)
+
+
+def make_small_env():
+    """Build the tiny problem used by ``run_benchmarks.py --overhead``."""
+    return make_env(n=2)
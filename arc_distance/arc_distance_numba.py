@@ -2,9 +2,11 @@
 # License: MIT
 
 from arc_distance import arc_distance_python as adp
-from numba import autojit
+from artifact_cache import numba_jit
 
 
 benchmarks = (("arc_distance_numba_for_loops",
-               autojit(adp.arc_distance_python_nested_for_loops)),
+               numba_jit(adp.arc_distance_python_nested_for_loops)),
+              ("arc_distance_numba_precomputed_for_loops",
+               numba_jit(adp.arc_distance_python_precomputed_for_loops)),
               )
@@ -4,6 +4,15 @@
 
 import numpy as np
 from math import *
+from functools import partial
+import worker_pool
+import tempfile
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport
+    ThreadPoolExecutor = None
 
 
 def arc_distance_python_nested_for_loops(a, b):
@@ -64,8 +73,175 @@ def arc_distance_numpy_broadcast(a, b):
     distance_matrix = 2 * (np.arctan2(np.sqrt(temp), np.sqrt(1 - temp)))
     return distance_matrix
 
+
+# The precomputed variants map each point (theta, phi) to the unit vector
+# (sin(theta), cos(theta) * cos(phi), cos(theta) * sin(phi)) once: the
+# haversine term temp of two points is then a quarter of the squared chord
+# between their unit vectors, only multiplies and adds per pair of points.
+
+
+def arc_distance_python_precomputed_for_loops(a, b):
+    """
+    Calculates the pairwise arc distance between all points in vector a and b.
+    """
+    a_nrows = a.shape[0]
+    b_nrows = b.shape[0]
+
+    distance_matrix = np.zeros([a_nrows, b_nrows])
+
+    b_x = np.zeros(b_nrows)
+    b_y = np.zeros(b_nrows)
+    b_z = np.zeros(b_nrows)
+    for j in range(b_nrows):
+        b_x[j] = sin(b[j, 0])
+        b_y[j] = cos(b[j, 0]) * cos(b[j, 1])
+        b_z[j] = cos(b[j, 0]) * sin(b[j, 1])
+
+    for i in range(a_nrows):
+        a_x = sin(a[i, 0])
+        a_y = cos(a[i, 0]) * cos(a[i, 1])
+        a_z = cos(a[i, 0]) * sin(a[i, 1])
+        for j in range(b_nrows):
+            temp = ((a_x - b_x[j]) * (a_x - b_x[j])
+                    + (a_y - b_y[j]) * (a_y - b_y[j])
+                    + (a_z - b_z[j]) * (a_z - b_z[j])) / 4
+            distance_matrix[i, j] = 2 * (atan2(sqrt(temp), sqrt(1 - temp)))
+    return distance_matrix
+
+
+def arc_distance_prepare(b):
+    """
+    Precomputes the unit vectors of the points in vector b, to be reused by
+    arc_distance_query for any number of queries against b.
+    """
+    theta, phi = b[:, 0], b[:, 1]
+    cos_theta = np.cos(theta)
+    return np.array([np.sin(theta), cos_theta * np.cos(phi),
+                     cos_theta * np.sin(phi)])
+
+
+def arc_distance_query(a, prepared, out=None):
+    """
+    Calculates the pairwise arc distance between all points in vector a and
+    the points prepared by arc_distance_prepare, optionally into out.
+    """
+    a_xyz = arc_distance_prepare(a)
+    if out is None:
+        out = np.empty((a.shape[0], prepared.shape[1]))
+    temp = out
+    temp[...] = 0
+    for a_coord, b_coord in zip(a_xyz, prepared):
+        chord = a_coord[:, None] - b_coord[None, :]
+        chord *= chord
+        temp += chord
+    temp /= 4
+    np.arctan2(np.sqrt(temp), np.sqrt(1 - temp), out=out)
+    out *= 2
+    return out
+
+
+def arc_distance_numpy_precomputed(a, b):
+    """
+    Calculates the pairwise arc distance between all points in vector a and b.
+    """
+    return arc_distance_query(a, arc_distance_prepare(b))
+
+
+# Number of points of a of each query of arc_distance_numpy_prepared_queries
+QUERY_SIZE = 100
+
+
+def arc_distance_numpy_prepared_queries(a, b):
+    """
+    Queries the points of vector a against b in batches of QUERY_SIZE
+    points, preparing b only once.
+    """
+    prepared = arc_distance_prepare(b)
+    return np.vstack([arc_distance_query(a[i:i + QUERY_SIZE], prepared)
+                      for i in range(0, a.shape[0], QUERY_SIZE)])
+
+
+# Size in bytes of the row blocks of the streaming variants
+BLOCK_BYTES = 2 ** 22
+
+# Minimum number of row blocks per thread of arc_distance_threaded
+BLOCKS_PER_THREAD = 4
+
+
+def _block_rows(a, b, block_size, n_threads=None):
+    if block_size is None:
+        block_size = BLOCK_BYTES // (8 * max(b.shape[0], 1))
+        if n_threads is not None:
+            # Enough blocks to keep all the threads busy
+            block_size = min(block_size, -(-a.shape[0] //
+                                           (BLOCKS_PER_THREAD * n_threads)))
+    return max(1, block_size)
+
+
+def arc_distance_blocks(a, b, block_size=None):
+    """
+    Yields the (start, block) row blocks of the pairwise arc distance matrix
+    between all points in vector a and b, without materializing it.
+    """
+    prepared = arc_distance_prepare(b)
+    block_size = _block_rows(a, b, block_size)
+    for start in range(0, a.shape[0], block_size):
+        yield start, arc_distance_query(a[start:start + block_size], prepared)
+
+
+def arc_distance_threaded(a, b, out=None, n_threads=None, block_size=None):
+    """
+    Calculates the pairwise arc distance between all points in vector a and b
+    by row blocks computed in a pool of n_threads threads (NumPy releases
+    the GIL in its ufuncs). out is the output array, or the filename or file
+    object of a memory-mapped output for results that do not fit in memory.
+    """
+    shape = (a.shape[0], b.shape[0])
+    if out is None:
+        out = np.empty(shape)
+    elif not isinstance(out, np.ndarray):
+        out = np.memmap(out, dtype=np.double, mode='w+', shape=shape)
+    if ThreadPoolExecutor is None:
+        raise ImportError("arc_distance_threaded requires concurrent.futures")
+    if n_threads is None:
+        n_threads = worker_pool.available_cores()
+    prepared = arc_distance_prepare(b)
+    block_size = _block_rows(a, b, block_size, n_threads)
+
+    def compute_block(start):
+        arc_distance_query(a[start:start + block_size], prepared,
+                           out=out[start:start + block_size])
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        # Consume the results to raise the errors of the threads
+        list(executor.map(compute_block, range(0, shape[0], block_size)))
+    if isinstance(out, np.memmap):
+        out.flush()
+    return out
+
+
+def arc_distance_numpy_threaded_memmap(a, b):
+    """
+    Calculates the pairwise arc distance between all points in vector a and
+    b with all the cores into a memory-mapped temporary file.
+    """
+    return arc_distance_threaded(a, b, out=tempfile.TemporaryFile())
+
+
 benchmarks = (
     arc_distance_python_nested_for_loops,
     arc_distance_numpy_tile,
     arc_distance_numpy_broadcast,
+    arc_distance_python_precomputed_for_loops,
+    arc_distance_numpy_precomputed,
+    arc_distance_numpy_prepared_queries,
+    ("arc_distance_numpy_threads_1", partial(arc_distance_threaded,
+                                             n_threads=1)),
+    ("arc_distance_numpy_threads_2", partial(arc_distance_threaded,
+                                             n_threads=2)),
+    ("arc_distance_numpy_threads_4", partial(arc_distance_threaded,
+                                             n_threads=4)),
+    ("arc_distance_numpy_threads_8", partial(arc_distance_threaded,
+                                             n_threads=8)),
+    arc_distance_numpy_threaded_memmap,
 )
@@ -2,10 +2,10 @@
 # License: MIT
 
 from arc_distance import arc_distance_python
-from pythran import compile_pythrancode
+import artifact_cache
 from inspect import getsource
+from timeit import default_timer
 import re
-import imp
 
 # grab imports
 imports = '''
@@ -15,25 +15,32 @@ from math import *
 
 exports = '''
 #pythran export arc_distance_python_nested_for_loops(float [][], float [][])
+#pythran export arc_distance_python_precomputed_for_loops(float [][], float [][])
 '''
 
 modname = 'arc_distance_pythran'
 
 # grab the source from original functions
-funs = (arc_distance_python.arc_distance_python_nested_for_loops,)
+funs = (arc_distance_python.arc_distance_python_nested_for_loops,
+        arc_distance_python.arc_distance_python_precomputed_for_loops)
 sources = map(getsource, funs)
 source = '\n'.join(sources)
 
 # patch
 source = re.sub(r'\[a_nrows, b_nrows\]', '(a_nrows, b_nrows)', source)
 
-# compile to native module
+# compile to a native module, or load it from the artifact cache
 source = '\n'.join([exports, imports, source])
-native = compile_pythrancode(modname, source)
-
-# load
-native = imp.load_dynamic(modname, native)
+tic = default_timer()
+native = artifact_cache.load_pythran(modname, source)
+compile_time = default_timer() - tic
 
 benchmarks = (("arc_distance_pythran_nested_for_loops",
                native.arc_distance_python_nested_for_loops),
+              ("arc_distance_pythran_precomputed_for_loops",
+               native.arc_distance_python_precomputed_for_loops),
               )
+
+# Time spent building the native module (or loading it from the artifact
+# cache), reported by run_benchmarks.py
+compile_times = dict((name, compile_time) for name, _ in benchmarks)
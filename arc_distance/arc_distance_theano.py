@@ -2,6 +2,10 @@
 # License: MIT
 import theano
 import theano.tensor as tensor
+from timeit import default_timer
+
+# Time spent compiling each theano function, reported by run_benchmarks.py
+compile_times = {}
 
 
 def arc_distance_theano_alloc_prepare(dtype='float64'):
@@ -25,9 +29,11 @@ def arc_distance_theano_alloc_prepare(dtype='float64'):
     distance_matrix = 2 * (tensor.arctan2(tensor.sqrt(temp),
                                           tensor.sqrt(1 - temp)))
     name = "arc_distance_theano_alloc"
+    tic = default_timer()
     rval = theano.function([a, b],
                            distance_matrix,
                            name=name)
+    compile_times[name] = default_timer() - tic
     rval.__name__ = name
 
     return rval
@@ -52,9 +58,11 @@ def arc_distance_theano_broadcast_prepare(dtype='float64'):
     distance_matrix = 2 * (tensor.arctan2(tensor.sqrt(temp),
                                           tensor.sqrt(1 - temp)))
     name = "arc_distance_theano_broadcast"
+    tic = default_timer()
     rval = theano.function([a, b],
                            distance_matrix,
                            name=name)
+    compile_times[name] = default_timer() - tic
     rval.__name__ = name
 
     return rval
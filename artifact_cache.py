@@ -0,0 +1,193 @@
+# License: MIT
+"""Persistent on-disk cache of the native code built by the benchmarks
+
+Pythran extension modules, OpenCL program binaries and numba ``cache=True``
+artifacts are stored under ``CACHE_DIR``, keyed by a hash of their source,
+compiler flags, the parameters they are specialized for (shapes, dtypes,
+devices...) and the interpreter and compiler versions. The least recently
+used files are evicted when the cache grows over ``MAX_SIZE`` bytes.
+
+The location and size of the cache can be set with the
+``PYTHON_BENCHMARKS_CACHE`` and ``PYTHON_BENCHMARKS_CACHE_SIZE`` environment
+variables.
+"""
+import hashlib
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+CACHE_DIR = os.environ.get(
+    'PYTHON_BENCHMARKS_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'python-benchmarks'))
+
+MAX_SIZE = int(os.environ.get('PYTHON_BENCHMARKS_CACHE_SIZE', 2 ** 30))
+
+# numba reads its cache location when it is imported
+os.environ.setdefault('NUMBA_CACHE_DIR', os.path.join(CACHE_DIR, 'numba'))
+
+# Cache hits and misses of this process, reported by run_benchmarks.py (see
+# current_stats)
+stats = {'hits': 0, 'misses': 0}
+
+# Dispatchers returned by numba_jit: numba counts their cache hits and misses
+# itself, when they are compiled
+_numba_dispatchers = []
+
+
+def current_stats():
+    """Cache hits and misses of this process, including the numba ones"""
+    current = dict(stats)
+    for dispatcher in _numba_dispatchers:
+        dispatcher_stats = getattr(dispatcher, 'stats', None)
+        if dispatcher_stats is None:
+            # numba versions without compilation statistics
+            continue
+        current['hits'] += sum(dispatcher_stats.cache_hits.values())
+        current['misses'] += sum(dispatcher_stats.cache_misses.values())
+    return current
+
+
+def cache_key(*parts):
+    """Hash the interpreter version and the given parts"""
+    h = hashlib.sha1()
+    h.update(sys.version.encode('utf-8'))
+    for part in parts:
+        h.update(repr(part).encode('utf-8'))
+    return h.hexdigest()
+
+
+def cache_path(kind, key, suffix=''):
+    folder = os.path.join(CACHE_DIR, kind)
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    return os.path.join(folder, key + suffix)
+
+
+def _lookup(path):
+    if os.path.exists(path):
+        # The modification time of the entries is used to evict the least
+        # recently used ones
+        os.utime(path, None)
+        stats['hits'] += 1
+        return True
+    stats['misses'] += 1
+    return False
+
+
+def _store(path, data=None, filename=None):
+    # Write to a temporary file first so that concurrent processes never
+    # see a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        if filename is not None:
+            with open(filename, 'rb') as source:
+                shutil.copyfileobj(source, f)
+        else:
+            f.write(data)
+    os.rename(tmp_path, path)
+    evict()
+
+
+def _entry_group(root, filename):
+    # numba stores an index (.nbi) and data files (.nbc) per function: evict
+    # them together so that the index never refers to missing data
+    if filename.endswith(('.nbi', '.nbc')):
+        return os.path.join(root, filename.split('.')[0])
+    return os.path.join(root, filename)
+
+
+def evict(max_size=None):
+    """Remove the least recently used entries until the cache fits"""
+    if max_size is None:
+        max_size = MAX_SIZE
+    groups = {}
+    for root, _, filenames in os.walk(CACHE_DIR):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            group = groups.setdefault(_entry_group(root, filename),
+                                      [0, 0, []])
+            group[0] = max(group[0], st.st_mtime)
+            group[1] += st.st_size
+            group[2].append(path)
+
+    total_size = sum(size for _, size, _ in groups.values())
+    for _, size, paths in sorted(groups.values()):
+        if total_size <= max_size:
+            break
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total_size -= size
+
+
+def _load_dynamic(modname, path):
+    try:
+        import imp
+        return imp.load_dynamic(modname, path)
+    except ImportError:
+        from importlib.machinery import ExtensionFileLoader
+        from importlib.util import module_from_spec, spec_from_loader
+        loader = ExtensionFileLoader(modname, path)
+        module = module_from_spec(spec_from_loader(modname, loader))
+        loader.exec_module(module)
+        return module
+
+
+def load_pythran(modname, source, cxxflags=()):
+    """Compile a pythran module, or load it from the cache"""
+    import pythran
+    from pythran import compile_pythrancode
+
+    key = cache_key('pythran', modname, source, list(cxxflags),
+                    getattr(pythran, '__version__', None))
+    path = cache_path('pythran', key, '.so')
+    if not _lookup(path):
+        kwargs = {'cxxflags': list(cxxflags)} if cxxflags else {}
+        _store(path, filename=compile_pythrancode(modname, source, **kwargs))
+    return _load_dynamic(modname, path)
+
+
+def build_program(ctx, source, options=()):
+    """Build an OpenCL program, reusing the binaries cached for its devices"""
+    import pyopencl as cl
+
+    devices = ctx.devices
+    key = cache_key('opencl', source, list(options), cl.VERSION,
+                    [(d.platform.name, d.name, d.driver_version)
+                     for d in devices])
+    path = cache_path('opencl', key, '.bin')
+    if _lookup(path):
+        try:
+            with open(path, 'rb') as f:
+                binaries = pickle.load(f)
+            return cl.Program(ctx, devices, binaries).build(
+                options=list(options))
+        except Exception:
+            # Stale or corrupted entry: build it again
+            stats['hits'] -= 1
+            stats['misses'] += 1
+
+    program = cl.Program(ctx, source).build(options=list(options))
+    binaries = program.get_info(cl.program_info.BINARIES)
+    _store(path, data=pickle.dumps(list(binaries)))
+    return program
+
+
+def numba_jit(func):
+    """Lazily compile a function with numba, caching its code on disk"""
+    import numba
+    try:
+        dispatcher = numba.jit(cache=True)(func)
+    except TypeError:
+        # numba versions without on-disk caching
+        return numba.autojit(func)
+    _numba_dispatchers.append(dispatcher)
+    return dispatcher
@@ -16,3 +16,22 @@ def make_env(N=50):
     window_radius = 10
 
     return (image, state, state_next, window_radius), {}
+
+
+# The benchmarks write into ``state_next``: run_benchmarks.py restores the
+# inputs before each timed call
+mutating = True
+
+
+# Geometric range of problem sizes used by ``run_benchmarks.py --sweep``
+sweep_sizes = (25, 50, 100, 200, 400)
+
+
+def make_sweep_env(size):
+    """Build the environment of a ``size`` x ``size`` problem."""
+    return make_env(N=size)
+
+
+def make_small_env():
+    """Build the tiny problem used by ``run_benchmarks.py --overhead``."""
+    return make_env(N=4)
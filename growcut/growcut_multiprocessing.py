@@ -0,0 +1,164 @@
+# License: MIT
+"""Growcut decomposed in strips of rows over a pool of processes
+
+The image and the two state buffers live in shared memory, viewed without
+copies as NumPy arrays by the worker processes. The segments are kept
+across calls for the last problem shape (the inputs are copied into them at
+the start of each call), and the worker processes keep them attached. Each
+worker updates a strip of rows and reads the ``window_radius`` rows above
+and below it (its halos) directly from the state of the neighbouring strips:
+the end of each generation is the synchronization point after which the
+halos are up to date. The number of changes of the strips is summed by the
+parent.
+"""
+import atexit
+from functools import partial
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from growcut import growcut_python
+import worker_pool
+
+# Depths of the image and of the two state buffers
+DEPTHS = (3, 2, 2)
+
+# Shape, segments and views of the shared buffers of the parent process
+_buffers = None
+
+# Views by segment name of the buffers attached by a worker process
+_attached = {}
+_attached_segments = []
+
+
+def _release_buffers():
+    global _buffers
+    if _buffers is not None:
+        _, segments, views = _buffers
+        _buffers = None
+        # The views must be released before closing their segments
+        del views
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+
+atexit.register(_release_buffers)
+
+
+def _shared_buffers(height, width):
+    """Shared image and state buffers of a ``height`` x ``width`` problem"""
+    global _buffers
+    if _buffers is None or _buffers[0] != (height, width):
+        _release_buffers()
+        segments = [shared_memory.SharedMemory(
+            create=True, size=height * width * depth * 8) for depth in DEPTHS]
+        views = [np.ndarray((height, width, depth), dtype=np.double,
+                            buffer=shm.buf)
+                 for shm, depth in zip(segments, DEPTHS)]
+        _buffers = (height, width), segments, views
+    return _buffers[1], _buffers[2]
+
+
+def _attach(names, height, width):
+    # The parent swaps the two state buffers between generations: the
+    # segments stay attached as long as the set of names does not change
+    if set(names) != set(_attached):
+        _attached.clear()
+        for shm in _attached_segments:
+            shm.close()
+        _attached_segments[:] = [shared_memory.SharedMemory(name=name)
+                                 for name in names]
+        for shm, depth in zip(_attached_segments, DEPTHS):
+            _attached[shm.name] = np.ndarray(
+                (height, width, depth), dtype=np.double, buffer=shm.buf)
+    return [_attached[name] for name in names]
+
+
+def _growcut_strip(task):
+    (image_name, state_name, state_next_name, height, width,
+     window_radius, start, stop) = task
+    image, state, state_next = _attach(
+        (image_name, state_name, state_next_name), height, width)
+    return growcut_python._growcut_rows(image, state, state_next,
+                                        window_radius, start, stop)
+
+
+def _strips(height, n_processes):
+    # A few strips per process to balance the load
+    n_strips = min(height, 2 * n_processes)
+    bounds = np.linspace(0, height, n_strips + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _generation(names, height, width, window_radius, n_processes):
+    tasks = [names + (height, width, window_radius, start, stop)
+             for start, stop in _strips(height, n_processes)]
+    pool = worker_pool.get_pool(n_processes)
+    return sum(pool.imap_unordered(_growcut_strip, tasks))
+
+
+def _run(image, state, state_next, window_radius, max_generations,
+         n_processes):
+    if n_processes is None:
+        n_processes = worker_pool.available_cores()
+    height, width = image.shape[:2]
+    segments, (shared_image, current, following) = _shared_buffers(height,
+                                                                   width)
+    shared_image[...] = image
+    current[...] = state
+    following[...] = state_next
+    image_name, current_name, following_name = [shm.name
+                                                for shm in segments]
+    generations = 0
+    changes = 0
+    while generations < max_generations:
+        changes = _generation(
+            (image_name, current_name, following_name), height, width,
+            window_radius, n_processes)
+        generations += 1
+        if changes == 0 or generations == max_generations:
+            break
+        current_name, following_name = following_name, current_name
+        current, following = following, current
+    state_next[...] = following
+    return generations, changes
+
+
+def growcut_multiprocessing(image, state, state_next, window_radius,
+                            n_processes=None):
+    """One growcut generation computed in strips over a pool of
+    ``n_processes`` processes, by default one per available core"""
+    return _run(image, state, state_next, window_radius, 1, n_processes)[1]
+
+
+def growcut_multiprocessing_converge(image, state, state_next, window_radius,
+                                     max_generations=10000,
+                                     n_processes=None):
+    """Growcut generations until no pixel changes, computed in strips over
+    a pool of ``n_processes`` processes. The converged state is left in
+    ``state_next``.
+
+    Returns the number of generations, including the last one that did not
+    change anything.
+    """
+    return _run(image, state, state_next, window_radius, max_generations,
+                n_processes)[0]
+
+
+benchmarks = (
+    growcut_multiprocessing,
+    growcut_multiprocessing_converge,
+    ("growcut_multiprocessing_processes_1",
+     partial(growcut_multiprocessing, n_processes=1)),
+    ("growcut_multiprocessing_processes_2",
+     partial(growcut_multiprocessing, n_processes=2)),
+    ("growcut_multiprocessing_processes_4",
+     partial(growcut_multiprocessing, n_processes=4)),
+    ("growcut_multiprocessing_processes_8",
+     partial(growcut_multiprocessing, n_processes=8)),
+)
+
+benchmark_metrics = {
+    'growcut_multiprocessing_converge': growcut_python.convergence_metrics,
+}
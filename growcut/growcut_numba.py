@@ -1,8 +1,8 @@
 from growcut import growcut_python
-from numba import autojit
+from artifact_cache import numba_jit
 
 
 benchmarks = (
     ("growcut_numba",
-     autojit(growcut_python.growcut_python)),
+     numba_jit(growcut_python.growcut_python)),
 )
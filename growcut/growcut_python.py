@@ -1,6 +1,7 @@
 # Authors: Nathan Faggian, Stefan van der Walt, Aron Ahmadia, Olivier Grisel
 # https://github.com/stefanv/growcut_py
 import numpy as np
+from functools import partial
 
 
 def window_floor(idx, radius):
@@ -55,6 +56,219 @@ def growcut_python(image, state, state_next, window_radius):
     return changes
 
 
+def growcut_numpy(image, state, state_next, window_radius, dtype=None):
+    """Vectorized growcut iterating over the offsets of the window
+
+    Each offset updates all the pixels at once from their neighbour at that
+    offset, in the order of the loops of growcut_python, which gives the
+    same state and number of changes. The computation is done in ``dtype``
+    (e.g. ``np.float32``) when given, converting the inputs that do not have
+    that dtype yet.
+    """
+    if dtype is not None:
+        image = np.asarray(image, dtype=dtype)
+        state = np.asarray(state, dtype=dtype)
+    return _growcut_rows(image, state, state_next, window_radius,
+                         0, image.shape[0])
+
+
+# Inputs of the last call of growcut_numpy_float32 and their float32 copies
+_float32_inputs = []
+
+
+def growcut_numpy_float32(image, state, state_next, window_radius):
+    """growcut_numpy computed in float32
+
+    The float32 copies of the inputs are made on the first call with these
+    input arrays only, so that the conversions are not timed along with the
+    computation: their content must not change between calls.
+    """
+    if not (_float32_inputs and _float32_inputs[0] is image and
+            _float32_inputs[1] is state):
+        _float32_inputs[:] = [image, state, image.astype(np.float32),
+                              state.astype(np.float32)]
+    return growcut_numpy(_float32_inputs[2], _float32_inputs[3], state_next,
+                         window_radius, dtype=np.float32)
+
+
+def _growcut_rows(image, state, state_next, window_radius, start, stop):
+    """Same as growcut_numpy for the rows start:stop of the image only"""
+    sqrt_3 = np.sqrt(3.0)
+
+    height = image.shape[0]
+    width = image.shape[1]
+
+    winning_colony = state[start:stop, :, 0].copy()
+    defense_strength = state[start:stop, :, 1].copy()
+    changes = 0
+
+    for dj in range(-window_radius, window_radius + 1):
+        for di in range(-window_radius, window_radius + 1):
+            if (di == 0 and dj == 0) or abs(di) >= height or abs(dj) >= width:
+                continue
+            # pixels [rows, cols] attacked by the pixels [ii, jj]
+            first = max(start, -di)
+            last = min(stop, height - di)
+            if first >= last:
+                continue
+            rows = slice(first, last)
+            cols = slice(max(0, -dj), min(width, width - dj))
+            ii = slice(first + di, last + di)
+            jj = slice(max(0, dj), min(width, width + dj))
+
+            d = image[rows, cols, 0] - image[ii, jj, 0]
+            s = d * d
+            for k in range(1, 3):
+                d = image[rows, cols, k] - image[ii, jj, k]
+                s += d * d
+            gval = 1.0 - np.sqrt(s) / sqrt_3
+
+            attack_strength = gval * state[ii, jj, 1]
+
+            # rows of the pixels [rows, cols] in the arrays of the results
+            strip = slice(first - start, last - start)
+            defense = defense_strength[strip, cols]
+            wins = attack_strength > defense
+            changes += np.count_nonzero(wins)
+            np.copyto(defense, attack_strength, where=wins)
+            np.copyto(winning_colony[strip, cols], state[ii, jj, 0],
+                      where=wins)
+
+    state_next[start:stop, :, 0] = winning_colony
+    state_next[start:stop, :, 1] = defense_strength
+
+    return int(changes)
+
+
+def _growcut_pixels(image, state, state_next, window_radius, pi, pj):
+    """Same as growcut_numpy for the pixels at rows pi and columns pj only"""
+    height = image.shape[0]
+    width = image.shape[1]
+    sqrt_3 = np.sqrt(3.0)
+
+    winning_colony = state[pi, pj, 0]
+    defense_strength = state[pi, pj, 1]
+    changes = 0
+
+    for dj in range(-window_radius, window_radius + 1):
+        for di in range(-window_radius, window_radius + 1):
+            if di == 0 and dj == 0:
+                continue
+            ii = pi + di
+            jj = pj + dj
+            inside = np.flatnonzero((ii >= 0) & (ii < height) &
+                                    (jj >= 0) & (jj < width))
+            i = pi[inside]
+            j = pj[inside]
+            ii = ii[inside]
+            jj = jj[inside]
+
+            d = image[i, j, 0] - image[ii, jj, 0]
+            s = d * d
+            for k in range(1, 3):
+                d = image[i, j, k] - image[ii, jj, k]
+                s += d * d
+            gval = 1.0 - np.sqrt(s) / sqrt_3
+
+            attack_strength = gval * state[ii, jj, 1]
+
+            wins = attack_strength > defense_strength[inside]
+            changes += np.count_nonzero(wins)
+            defense_strength[inside[wins]] = attack_strength[wins]
+            winning_colony[inside[wins]] = state[ii[wins], jj[wins], 0]
+
+    state_next[pi, pj, 0] = winning_colony
+    state_next[pi, pj, 1] = defense_strength
+
+    return int(changes)
+
+
+def _dilate(mask, radius):
+    """Pixels of the windows of radius ``radius`` around the pixels of mask"""
+    for axis in (0, 1):
+        # number of pixels of mask up to each index along the axis
+        counts = np.cumsum(mask, axis=axis)
+        n = mask.shape[axis]
+        upper = np.take(counts, np.minimum(np.arange(n) + radius, n - 1),
+                        axis=axis)
+        lower = np.take(counts, np.maximum(np.arange(n) - radius - 1, 0),
+                        axis=axis)
+        if axis == 0:
+            lower[:radius + 1] = 0
+        else:
+            lower[:, :radius + 1] = 0
+        mask = upper > lower
+    return mask
+
+
+# Above this fraction of the pixels in the frontier, updating all the pixels
+# with growcut_numpy is faster than updating the frontier pixel by pixel
+FRONTIER_MAX_FRACTION = 0.25
+
+
+def growcut_numpy_converge(image, state, state_next, window_radius,
+                           max_generations=10000, frontier=True):
+    """Run growcut generations until no pixel changes
+
+    ``state`` and ``state_next`` are swapped after each generation (both
+    are overwritten) and the converged state is left in ``state_next``.
+    When ``frontier`` is True, the generations after the first one only
+    update the pixels in the window of a pixel that changed during the
+    previous generation (the state of the other pixels cannot change), as
+    long as this frontier is small enough.
+
+    Returns the number of generations, including the last one that did not
+    change anything.
+    """
+    current, following = state, state_next
+    growcut_numpy(image, current, following, window_radius)
+    changed = np.any(following != current, axis=2)
+    generations = 1
+    while changed.any() and generations < max_generations:
+        current, following = following, current
+        active = _dilate(changed, window_radius) if frontier else None
+        if frontier and active.mean() < FRONTIER_MAX_FRACTION:
+            # The pixels outside of the frontier did not change during the
+            # previous generation either: following is up to date there
+            pi, pj = np.nonzero(active)
+            _growcut_pixels(image, current, following, window_radius,
+                            pi, pj)
+            changed[...] = False
+            changed[pi, pj] = np.any(following[pi, pj] != current[pi, pj],
+                                     axis=1)
+        else:
+            growcut_numpy(image, current, following, window_radius)
+            changed = np.any(following != current, axis=2)
+        generations += 1
+    if following is not state_next:
+        state_next[...] = following
+    return generations
+
+
+def convergence_metrics(record, args, kwargs):
+    """Number of generations to convergence and generations per second"""
+    image, state, state_next, window_radius = args
+    generations = growcut_numpy_converge(image, state.copy(),
+                                         state_next.copy(), window_radius)
+    return {
+        'generations': generations,
+        'generations_per_second': generations / record['warm_time'],
+        'time_to_convergence': record['warm_time'],
+    }
+
+
 benchmarks = (
     growcut_python,
+    growcut_numpy,
+    growcut_numpy_float32,
+    growcut_numpy_converge,
+    ("growcut_numpy_converge_full_sweeps",
+     partial(growcut_numpy_converge, frontier=False)),
 )
+
+# Extra metrics of the benchmarks, added to their records by
+# run_benchmarks.py
+benchmark_metrics = {
+    'growcut_numpy_converge': convergence_metrics,
+    'growcut_numpy_converge_full_sweeps': convergence_metrics,
+}
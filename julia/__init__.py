@@ -3,3 +3,21 @@
 
 def make_env(cr=0.285, ci=0.01, N=200, bound=1.5, lim=1000., cutoff=1e6):
     return (cr, ci, N, bound, lim, cutoff), {}
+
+
+# Geometric range of problem sizes used by ``run_benchmarks.py --sweep``
+sweep_sizes = (50, 100, 200, 400, 800, 1600)
+
+
+def make_sweep_env(size):
+    """Build the environment of a ``size`` x ``size`` problem."""
+    return make_env(N=size)
+
+
+def make_small_env():
+    """Build the tiny problem used by ``run_benchmarks.py --overhead``.
+
+    The cutoff is lowered too: the points of the set would otherwise iterate
+    a million times.
+    """
+    return make_env(N=8, cutoff=100)
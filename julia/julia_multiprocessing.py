@@ -0,0 +1,82 @@
+# License: MIT
+"""Julia set rendered over a pool of processes
+
+The Julia sets of z**2 + c are symmetric under z -> -z: only the upper half
+of the rows is computed, each row being mirrored into the lower half. The
+escape time is very unbalanced across the grid, so the rows are split into
+small tiles handed out dynamically to the worker processes, which write
+directly into an output array in shared memory.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from julia import julia_python
+import worker_pool
+
+# Number of rows of the tiles handed out to the worker processes
+TILE_ROWS = 4
+
+def _render_tile(task):
+    ''' Computes the rows `start:stop` of the Julia set in shared memory
+        and their mirrors, with the same operations as `julia_python.kernel`.
+    '''
+    shm_name, start, stop, cr, ci, N, bound, lim, cutoff = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        julia = np.ndarray((N, N), dtype=np.uint32, buffer=shm.buf)
+        grid_x = np.linspace(-bound, bound, N)
+        zr = np.repeat(grid_x[start:stop], N)
+        zi = np.tile(grid_x, stop - start)
+        # flat indices in the tile of the points that did not escape yet
+        active = np.arange(zr.size)
+        counts = np.empty(zr.size, dtype=np.uint32)
+        count = 0
+        while active.size and count < cutoff:
+            escaped = zr * zr + zi * zi >= lim * lim
+            if escaped.any():
+                counts[active[escaped]] = count
+                remaining = np.logical_not(escaped)
+                zr = zr[remaining]
+                zi = zi[remaining]
+                active = active[remaining]
+            zr, zi = zr * zr - zi * zi + cr, 2 * zr * zi + ci
+            count += 1
+        counts[active] = count
+        counts = counts.reshape(stop - start, N)
+        julia[start:stop] = counts
+        # z -> -z maps the row i to the reversed row N - 1 - i
+        julia[N - stop:N - start] = counts[::-1, ::-1]
+        del julia
+    finally:
+        shm.close()
+    return stop - start
+
+
+def julia_multiprocessing(cr, ci, N, bound=1.5, lim=1000., cutoff=1e6):
+    ''' Calculation of the Julia set for a given `c` over a pool of processes,
+        computing the upper half of the rows only.
+    '''
+    shm = shared_memory.SharedMemory(create=True, size=N * N * 4)
+    try:
+        # the middle row of an odd N is its own mirror
+        n_rows = (N + 1) // 2
+        tasks = [(shm.name, start, min(start + TILE_ROWS, n_rows),
+                  cr, ci, N, bound, lim, cutoff)
+                 for start in range(0, n_rows, TILE_ROWS)]
+        for _ in worker_pool.get_pool().imap_unordered(_render_tile, tasks):
+            pass
+        julia = np.ndarray((N, N), dtype=np.uint32, buffer=shm.buf).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return julia
+
+
+benchmarks = (
+    julia_multiprocessing,
+)
+
+benchmark_metrics = {
+    'julia_multiprocessing': julia_python.frame_rate(),
+}
@@ -1,8 +1,34 @@
 from julia import julia_python
-from numba import autojit
+from artifact_cache import numba_jit
+from functools import partial
 
 
 benchmarks = (
     ("julia_numba_for_loops",
-     autojit(julia_python.julia_python_for_loops)),
+     numba_jit(julia_python.julia_python_for_loops)),
+    ("julia_numba_active_set_loops",
+     numba_jit(julia_python.julia_python_active_set_loops)),
+    ("julia_numba_for_loops_periodic",
+     numba_jit(julia_python.julia_python_for_loops_periodic)),
+    ("julia_numba_for_loops_batch",
+     julia_python.batched(
+         numba_jit(julia_python.julia_python_for_loops_frames))),
+    ("julia_numba_for_loops_interior",
+     partial(julia_python.interior,
+             numba_jit(julia_python.julia_python_for_loops))),
+    ("julia_numba_for_loops_interior_periodic",
+     partial(julia_python.interior,
+             numba_jit(julia_python.julia_python_for_loops_periodic))),
 )
+
+benchmark_metrics = {
+    'julia_numba_for_loops': julia_python.frame_rate(),
+    'julia_numba_active_set_loops': julia_python.frame_rate(),
+    'julia_numba_for_loops_periodic': julia_python.frame_rate(
+        1, julia_python.periodicity_metrics),
+    'julia_numba_for_loops_batch': julia_python.frame_rate(
+        julia_python.BATCH_SIZE),
+    'julia_numba_for_loops_interior': julia_python.frame_rate(),
+    'julia_numba_for_loops_interior_periodic': julia_python.frame_rate(
+        1, julia_python.interior_periodicity_metrics),
+}
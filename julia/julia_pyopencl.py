@@ -3,14 +3,41 @@
 
 import numpy as np
 import pyopencl as cl
+import artifact_cache
+from timeit import default_timer
+from functools import partial
+from julia import julia_python
 
 mf = cl.mem_flags
 
 PROFILING = 0
 
+# Kernels of the programs with and without periodicity checking
 _cache = {}
 
-def julia_cpu_prepare(cr, ci, N, bound, lim, cutoff):
+# Time spent building the OpenCL programs (or loading them from the
+# artifact cache), reported by run_benchmarks.py
+compile_times = {}
+
+# Brent's cycle detection of the periodic orbits of the interior points,
+# inserted in the iteration loop of the kernel by julia_cpu_prepare
+PERIODICITY_CHECK = """
+              double dr = zr - sr;
+              double di = zi - si;
+              if (dr * dr + di * di <= toltol)
+              {
+                  count = (long) ceil(cutoff);
+                  break;
+              }
+              if (count == next_save)
+              {
+                  sr = zr;
+                  si = zi;
+                  next_save *= 2;
+              }
+"""
+
+def julia_cpu_prepare(periodic=False):
     ctx = cl.create_some_context()
     if PROFILING:
         queue = cl.CommandQueue(
@@ -19,46 +46,78 @@ def julia_cpu_prepare(cr, ci, N, bound, lim, cutoff):
     else:
         queue = cl.CommandQueue(ctx)
 
-    grid_x = np.linspace(-bound, bound, N)
-    x0 = grid_x[0]
-    dx = grid_x[1] - grid_x[0]
-    limlim = lim ** 2
+    periodicity_check = PERIODICITY_CHECK if periodic else ''
 
-    prg = cl.Program(ctx, """
-        __kernel void foo(__global long *outbuf)
+    # The parameters are kernel arguments: the program is built once
+    # whatever the c values and the grid
+    tic = default_timer()
+    prg = artifact_cache.build_program(ctx, """
+        __kernel void foo(__global long *outbuf,
+                          __global const double *crs,
+                          __global const double *cis,
+                          long N, double x0, double dx, double limlim,
+                          double cutoff, double toltol)
         {
-          int ii = get_global_id(0);
-          int jj = get_global_id(1);
+          int kk = get_global_id(0);
+          int ii = get_global_id(1);
+          int jj = get_global_id(2);
 
-          double zr = %(x0)s + ii * %(dx)s;
-          double zi = %(x0)s + jj * %(dx)s;
+          double cr = crs[kk];
+          double ci = cis[kk];
+          double zr = x0 + ii * dx;
+          double zi = x0 + jj * dx;
           long count = 0;
+          double sr = zr;
+          double si = zi;
+          long next_save = 1;
 
-          while (((zr*zr + zi*zi) < %(limlim)s) && (count < %(cutoff)s))
+          while (((zr*zr + zi*zi) < limlim) && (count < cutoff))
           {
-              double tmp = zr * zr - zi * zi + %(cr)s;
-              zi = 2. * zr * zi + %(ci)s;
+              double tmp = zr * zr - zi * zi + cr;
+              zi = 2. * zr * zi + ci;
               zr = tmp;
               count += 1;
+              %(periodicity_check)s
           }
-          outbuf[ii * %(N)s + jj] = count;
+          outbuf[(kk * N + ii) * N + jj] = count;
           }
 
-        """ % locals()).build()
+        """ % locals())
+    compile_time = default_timer() - tic
+    if periodic:
+        compile_times['julia_pyopencl_periodic'] = compile_time
+    else:
+        compile_times['julia_pyopencl'] = compile_time
+        compile_times['julia_pyopencl_batch'] = compile_time
 
     return prg.foo, queue, ctx
 
 
-def julia_pyopencl(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
-    output = np.empty((N, N), dtype='int64')
-    args = (cr, ci, N, bound, lim, cutoff)
+def julia_pyopencl_frames(crs, cis, N, bound=1.5, lim=4., cutoff=1e6,
+                          tol=None):
+    """Render the frames of the c values crs + 1j * cis in a single launch,
+    parallel across frames and pixels"""
+    crs = np.ascontiguousarray(crs, dtype=np.double)
+    cis = np.ascontiguousarray(cis, dtype=np.double)
+    n_frames = len(crs)
+    output = np.empty((n_frames, N, N), dtype='int64')
+    periodic = tol is not None
     try:
-        f, queue, ctx = _cache[args]
-    except:
-        f, queue, ctx = julia_cpu_prepare(*args)
-        _cache[args] = f, queue, ctx
+        f, queue, ctx = _cache[periodic]
+    except KeyError:
+        f, queue, ctx = julia_cpu_prepare(periodic)
+        _cache[periodic] = f, queue, ctx
+
+    grid_x = np.linspace(-bound, bound, N)
+    x0 = grid_x[0]
+    dx = grid_x[1] - grid_x[0]
+    toltol = tol ** 2 if periodic else 0.
+    cr_buf = cl.Buffer(ctx, mf.READ_ONLY | mf.COPY_HOST_PTR, hostbuf=crs)
+    ci_buf = cl.Buffer(ctx, mf.READ_ONLY | mf.COPY_HOST_PTR, hostbuf=cis)
     dest_buf = cl.Buffer(ctx, mf.WRITE_ONLY, output.nbytes)
-    ev = f(queue, (N, N), None, dest_buf)
+    ev = f(queue, (n_frames, N, N), None, dest_buf, cr_buf, ci_buf,
+           np.int64(N), np.float64(x0), np.float64(dx),
+           np.float64(lim ** 2), np.float64(cutoff), np.float64(toltol))
     if PROFILING:
         ev.wait()
         print 'computation time', 1e-9 * (ev.profile.end - ev.profile.start)
@@ -66,6 +125,31 @@ def julia_pyopencl(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
     return output
 
 
+def julia_pyopencl(cr, ci, N, bound=1.5, lim=4., cutoff=1e6, tol=None):
+    return julia_pyopencl_frames([cr], [ci], N, bound, lim, cutoff, tol)[0]
+
+
+def julia_pyopencl_periodic(cr, ci, N, bound=1.5, lim=4., cutoff=1e6,
+                            tol=1e-12):
+    return julia_pyopencl(cr, ci, N, bound, lim, cutoff, tol)
+
+
 benchmarks = (
     julia_pyopencl,
+    julia_pyopencl_periodic,
+    ("julia_pyopencl_batch", julia_python.batched(julia_pyopencl_frames)),
+    ("julia_pyopencl_interior",
+     partial(julia_python.interior, julia_pyopencl)),
+    ("julia_pyopencl_interior_periodic",
+     partial(julia_python.interior, julia_pyopencl_periodic)),
 )
+
+benchmark_metrics = {
+    'julia_pyopencl': julia_python.frame_rate(),
+    'julia_pyopencl_periodic': julia_python.frame_rate(
+        1, julia_python.periodicity_metrics),
+    'julia_pyopencl_batch': julia_python.frame_rate(julia_python.BATCH_SIZE),
+    'julia_pyopencl_interior': julia_python.frame_rate(),
+    'julia_pyopencl_interior_periodic': julia_python.frame_rate(
+        1, julia_python.interior_periodicity_metrics),
+}
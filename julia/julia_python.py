@@ -1,6 +1,8 @@
 # Authors: Kurt W. Smith, Serge Guelton
 # License: MIT
 
+from functools import partial
+
 import numpy as np
 
 def kernel(zr, zi, cr, ci, lim, cutoff):
@@ -13,6 +15,27 @@ def kernel(zr, zi, cr, ci, lim, cutoff):
         count += 1
     return count
 
+def kernel_periodic(zr, zi, cr, ci, lim, cutoff, tol):
+    ''' Same as `kernel`, but stops as soon as the orbit of `z` comes back
+        within `tol` of a previous point (Brent's cycle detection): such
+        interior points never escape and `cutoff` is returned.
+    '''
+    count = 0
+    # point of the orbit saved at the powers of two iterations
+    sr = zr
+    si = zi
+    next_save = 1
+    while ((zr*zr + zi*zi) < (lim*lim)) and count < cutoff:
+        zr, zi = zr * zr - zi * zi + cr, 2 * zr * zi + ci
+        count += 1
+        if (zr - sr) * (zr - sr) + (zi - si) * (zi - si) <= tol * tol:
+            return int(cutoff)
+        if count == next_save:
+            sr = zr
+            si = zi
+            next_save *= 2
+    return count
+
 def julia_python_for_loops(cr, ci, N, bound=1.5, lim=1000., cutoff=1e6):
     ''' Pure Python calculation of the Julia set for a given `c`.  No NumPy
         array operations are used.
@@ -25,6 +48,19 @@ def julia_python_for_loops(cr, ci, N, bound=1.5, lim=1000., cutoff=1e6):
             julia[i,j] = kernel(x, y, cr, ci, lim, cutoff=cutoff)
     return julia
 
+def julia_python_for_loops_periodic(cr, ci, N, bound=1.5, lim=1000.,
+                                   cutoff=1e6, tol=1e-12):
+    ''' Pure Python calculation of the Julia set for a given `c`, detecting
+        the periodic orbits of the interior points with `kernel_periodic`.
+    '''
+    julia = np.empty((N, N), dtype=np.uint32)
+    grid_x = np.linspace(-bound, bound, N)
+    #"omp parallel for private(i, x, j, y)"
+    for i, x in enumerate(grid_x):
+        for j, y in enumerate(grid_x):
+            julia[i,j] = kernel_periodic(x, y, cr, ci, lim, cutoff, tol)
+    return julia
+
 def julia_python_numpy(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
     ''' Pure Python calculation of the Julia set for a given `c` using NumPy
     array operations.
@@ -46,7 +82,235 @@ def julia_python_numpy(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
     np.seterr(**orig_err)
     return julia
 
+def _julia_numpy_active_set(cr, ci, N, bound, lim, cutoff, tol=None):
+    ''' Iterate the compacted set of the points that did not escape yet,
+    removing the points with a periodic orbit when `tol` is given. `cr` and
+    `ci` are either scalars or arrays of the `c` values of several frames.
+
+    Returns the Julia set(s) and the number of point iterations computed.
+    '''
+    c = cr + 1j * ci
+    shape = np.shape(c) + (N, N)
+    julia = np.zeros(np.prod(shape), dtype=np.uint32)
+    X, Y = np.ogrid[-bound:bound:N*1j, -bound:bound:N*1j]
+    iterations = np.tile((X + Y * 1j).ravel(), np.size(c))
+    if np.ndim(c):
+        # c of each point, compacted along with the points
+        c = np.repeat(c, N * N)
+    # flat indices in julia of the points in iterations
+    active = np.arange(julia.size)
+    # points of the orbits saved at the powers of two iterations (Brent's
+    # cycle detection)
+    saved = None
+    next_save = 1
+    n_iterations = 0
+    count = 1
+    while active.size and count < cutoff:
+        escaped = np.abs(iterations) >= lim
+        if escaped.any():
+            julia[active[escaped]] = count
+        done = escaped
+        if saved is not None:
+            periodic = np.abs(iterations - saved) <= tol
+            periodic &= np.logical_not(escaped)
+            julia[active[periodic]] = cutoff
+            done = escaped | periodic
+        if done.any():
+            remaining = np.logical_not(done)
+            iterations = iterations[remaining]
+            active = active[remaining]
+            if np.ndim(c):
+                c = c[remaining]
+            if saved is not None:
+                saved = saved[remaining]
+        if tol is not None and count == next_save:
+            saved = iterations.copy()
+            next_save *= 2
+        count += 1
+        iterations *= iterations
+        iterations += c
+        n_iterations += active.size
+    if count == cutoff:
+        julia[active] = count
+    return julia.reshape(shape), n_iterations
+
+def julia_python_numpy_active_set(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
+    ''' Calculation of the Julia set for a given `c` using NumPy array
+    operations on the compacted set of the points that did not escape yet.
+    '''
+    return _julia_numpy_active_set(cr, ci, N, bound, lim, cutoff)[0]
+
+def julia_python_numpy_periodic(cr, ci, N, bound=1.5, lim=4., cutoff=1e6,
+                                tol=1e-12):
+    ''' Same as `julia_python_numpy_active_set`, also removing the interior
+    points as soon as their orbit is detected to be periodic.
+    '''
+    return _julia_numpy_active_set(cr, ci, N, bound, lim, cutoff, tol)[0]
+
+def periodicity_metrics(record, args, kwargs):
+    ''' Point iterations per image of the escape time algorithm, and the
+    ones saved by the periodicity checking.
+    '''
+    julia, n_iterations = _julia_numpy_active_set(*args, tol=1e-12, **kwargs)
+    # a point escaping at count n was iterated n - 1 times
+    total = int(np.sum(julia.astype(np.int64) - 1))
+    return {'iterations': total, 'iterations_saved': total - n_iterations}
+
+# `c` of the Douady rabbit, and the bound of a grid zoomed on the center of
+# its filled Julia set: about 80% of the points of the grid are interior
+# points, iterated up to the cutoff unless their periodic orbit is detected
+INTERIOR_C = (-0.12, 0.75)
+INTERIOR_BOUND = 0.4
+INTERIOR_CUTOFF = 3000.
+
+def _interior_args(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
+    return (INTERIOR_C[0], INTERIOR_C[1], N, INTERIOR_BOUND, lim,
+            min(cutoff, INTERIOR_CUTOFF))
+
+def interior(render, cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
+    ''' Renders with `render` the Julia set of `INTERIOR_C` on the grid of
+    `INTERIOR_BOUND` instead of the `c` and bound of the environment, with at
+    most `INTERIOR_CUTOFF` iterations.
+    '''
+    return render(*_interior_args(cr, ci, N, bound, lim, cutoff))
+
+interior.wrapped_args = _interior_args
+
+def interior_periodicity_metrics(record, args, kwargs):
+    ''' `periodicity_metrics` of the benchmarks wrapped in `interior`.
+    '''
+    return periodicity_metrics(record, _interior_args(*args, **kwargs), {})
+
+def julia_python_active_set_loops(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
+    ''' Pure Python calculation of the Julia set for a given `c`, iterating
+    step by step over the compacted set of the points that did not escape
+    yet like `julia_python_numpy_active_set`.
+    '''
+    julia = np.zeros((N, N), dtype=np.uint32)
+    grid_x = np.linspace(-bound, bound, N)
+    n_active = N * N
+    zr = np.empty(n_active)
+    zi = np.empty(n_active)
+    active = np.empty(n_active, np.int64)
+    for i in range(N):
+        for j in range(N):
+            zr[i * N + j] = grid_x[i]
+            zi[i * N + j] = grid_x[j]
+            active[i * N + j] = i * N + j
+    count = 1
+    while n_active > 0 and count < cutoff:
+        # compact the points that did not escape in place
+        n_remaining = 0
+        for k in range(n_active):
+            r = zr[k]
+            im = zi[k]
+            if r * r + im * im >= lim * lim:
+                julia[active[k] // N, active[k] % N] = count
+            else:
+                zr[n_remaining] = r * r - im * im + cr
+                zi[n_remaining] = 2 * r * im + ci
+                active[n_remaining] = active[k]
+                n_remaining += 1
+        n_active = n_remaining
+        count += 1
+    if count == cutoff:
+        for k in range(n_active):
+            julia[active[k] // N, active[k] % N] = count
+    return julia
+
+def julia_python_for_loops_frames(crs, cis, N, bound=1.5, lim=1000.,
+                                  cutoff=1e6):
+    ''' Pure Python calculation of the Julia sets of the frames with the
+        `c` values `crs + 1j * cis`, sharing the same grid.
+    '''
+    n_frames = len(crs)
+    julia = np.empty((n_frames, N, N), dtype=np.uint32)
+    grid_x = np.linspace(-bound, bound, N)
+    # rows of all the frames are computed in parallel
+    #"omp parallel for private(k, i, j)"
+    for row in range(n_frames * N):
+        k = row // N
+        i = row % N
+        for j in range(N):
+            julia[k, i, j] = kernel(grid_x[i], grid_x[j], crs[k], cis[k],
+                                    lim, cutoff)
+    return julia
+
+def julia_python_numpy_frames(crs, cis, N, bound=1.5, lim=4., cutoff=1e6):
+    ''' Calculation of the Julia sets of the frames with the `c` values
+    `crs + 1j * cis` using NumPy array operations on the compacted set of
+    the points of all the frames that did not escape yet.
+    '''
+    crs = np.asarray(crs, dtype=np.double)
+    cis = np.asarray(cis, dtype=np.double)
+    return _julia_numpy_active_set(crs, cis, N, bound, lim, cutoff)[0]
+
+# Number of frames rendered by each call of the batch benchmarks
+BATCH_SIZE = 16
+
+def batch_c_values(cr, ci, n_frames=BATCH_SIZE, radius=0.001):
+    ''' `c` values of `n_frames` animation frames circling around `c`, close
+    enough for the frames to look like the one of `c`.
+    '''
+    angles = np.linspace(0, 2 * np.pi, n_frames, endpoint=False)
+    return cr + radius * np.cos(angles), ci + radius * np.sin(angles)
+
+def _batch_args(cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
+    crs, cis = batch_c_values(cr, ci)
+    return crs, cis, N, bound, lim, cutoff
+
+def _render_batch(render_frames, cr, ci, N, bound=1.5, lim=4., cutoff=1e6):
+    return render_frames(*_batch_args(cr, ci, N, bound, lim, cutoff))
+
+# The arguments `run_benchmarks.py` compiles the wrapped benchmarks for,
+# ahead of their first call
+_render_batch.wrapped_args = _batch_args
+
+def batched(render_frames):
+    ''' Benchmark rendering the `BATCH_SIZE` frames around the `c` of the
+    environment with `render_frames`.
+    '''
+    return partial(_render_batch, render_frames)
+
+def frame_rate(n_frames=1, metrics=None):
+    ''' Metrics function reporting the frames rendered per second, along
+    with the metrics of the `metrics` function if any.
+    '''
+    def frame_rate_metrics(record, args, kwargs):
+        values = metrics(record, args, kwargs) if metrics is not None else {}
+        values['frames_per_second'] = n_frames / record['warm_time']
+        return values
+    return frame_rate_metrics
+
 benchmarks = (
     julia_python_for_loops,
     julia_python_numpy,
+    julia_python_numpy_active_set,
+    julia_python_active_set_loops,
+    julia_python_for_loops_periodic,
+    julia_python_numpy_periodic,
+    ("julia_python_numpy_batch", batched(julia_python_numpy_frames)),
+    ("julia_python_numpy_interior",
+     partial(interior, julia_python_numpy_active_set)),
+    ("julia_python_numpy_interior_periodic",
+     partial(interior, julia_python_numpy_periodic)),
+    ("julia_python_for_loops_interior_periodic",
+     partial(interior, julia_python_for_loops_periodic)),
 )
+
+# Extra metrics of the benchmarks, added to their records by
+# run_benchmarks.py
+benchmark_metrics = {
+    'julia_python_for_loops': frame_rate(),
+    'julia_python_numpy': frame_rate(),
+    'julia_python_numpy_active_set': frame_rate(),
+    'julia_python_active_set_loops': frame_rate(),
+    'julia_python_for_loops_periodic': frame_rate(1, periodicity_metrics),
+    'julia_python_numpy_periodic': frame_rate(1, periodicity_metrics),
+    'julia_python_numpy_batch': frame_rate(BATCH_SIZE),
+    'julia_python_numpy_interior': frame_rate(),
+    'julia_python_numpy_interior_periodic': frame_rate(
+        1, interior_periodicity_metrics),
+    'julia_python_for_loops_interior_periodic': frame_rate(
+        1, interior_periodicity_metrics),
+}
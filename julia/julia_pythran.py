@@ -1,12 +1,17 @@
 from julia import julia_python
-from pythran import compile_pythrancode
+import artifact_cache
 from inspect import getsource
-import re, imp
+from timeit import default_timer
+from functools import partial
+import re
 
 # grab imports
 imports = 'import numpy as np'
 exports = '''
 #pythran export julia_python_for_loops(float, float, int, float, float, float)
+#pythran export julia_python_active_set_loops(float, float, int, float, float, float)
+#pythran export julia_python_for_loops_periodic(float, float, int, float, float, float)
+#pythran export julia_python_for_loops_frames(float[], float[], int, float, float, float)
 '''
 modname = 'julia_pythran'
 
@@ -14,6 +19,10 @@ modname = 'julia_pythran'
 sources = map(getsource,
         (julia_python.julia_python_for_loops,
             julia_python.kernel,
+            julia_python.julia_python_active_set_loops,
+            julia_python.julia_python_for_loops_periodic,
+            julia_python.kernel_periodic,
+            julia_python.julia_python_for_loops_frames,
             )
         )
 source = '\n'.join(sources)
@@ -23,15 +32,40 @@ source = re.sub(r'cutoff=cutoff', 'cutoff', source)
 source = re.sub(r'dtype=np.uint32', 'np.uint32', source)
 source = re.sub(r'#"omp', '"omp', source)
 
-# compile to a native module
-native = compile_pythrancode(modname,
-                             '\n'.join([imports, exports, source]),
-                             cxxflags=['-O2', '-fopenmp'])
-
-# load it
-native = imp.load_dynamic(modname, native)
+# compile to a native module, or load it from the artifact cache
+tic = default_timer()
+native = artifact_cache.load_pythran(modname,
+                                     '\n'.join([imports, exports, source]),
+                                     cxxflags=['-O2', '-fopenmp'])
+compile_time = default_timer() - tic
 
 benchmarks = (
     ("julia_pythran_for_loops",
      native.julia_python_for_loops),
+    ("julia_pythran_active_set_loops",
+     native.julia_python_active_set_loops),
+    ("julia_pythran_for_loops_periodic",
+     native.julia_python_for_loops_periodic),
+    ("julia_pythran_for_loops_batch",
+     julia_python.batched(native.julia_python_for_loops_frames)),
+    ("julia_pythran_for_loops_interior",
+     partial(julia_python.interior, native.julia_python_for_loops)),
+    ("julia_pythran_for_loops_interior_periodic",
+     partial(julia_python.interior, native.julia_python_for_loops_periodic)),
 )
+
+# Time spent building the native module (or loading it from the artifact
+# cache), reported by run_benchmarks.py
+compile_times = dict((name, compile_time) for name, _ in benchmarks)
+
+benchmark_metrics = {
+    'julia_pythran_for_loops': julia_python.frame_rate(),
+    'julia_pythran_active_set_loops': julia_python.frame_rate(),
+    'julia_pythran_for_loops_periodic': julia_python.frame_rate(
+        1, julia_python.periodicity_metrics),
+    'julia_pythran_for_loops_batch': julia_python.frame_rate(
+        julia_python.BATCH_SIZE),
+    'julia_pythran_for_loops_interior': julia_python.frame_rate(),
+    'julia_pythran_for_loops_interior_periodic': julia_python.frame_rate(
+        1, julia_python.interior_periodicity_metrics),
+}
@@ -8,3 +8,17 @@ def make_env(shape=(300, 150), seed=0, dtype=np.double):
     rng = np.random.RandomState(seed)
     data = np.asarray(rng.normal(size=shape), dtype=dtype)
     return (data,), {}
+
+
+# Geometric range of problem sizes used by ``run_benchmarks.py --sweep``
+sweep_sizes = (100, 300, 1000, 3000, 10000, 30000, 50000)
+
+
+def make_sweep_env(size):
+    """Build the environment of a problem with ``size`` samples."""
+    return make_env(shape=(size, 150))
+
+
+def make_small_env():
+    """Build the tiny problem used by ``run_benchmarks.py --overhead``."""
+    return make_env(shape=(2, 3))
@@ -23,6 +23,28 @@ def pairwise_cython_for_loops(double[:, ::1] data):
     return np.asarray(distances)
 
 
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def pairwise_cython_condensed_for_loops(double[:, ::1] data):
+    cdef Py_ssize_t n_samples = data.shape[0]
+    cdef Py_ssize_t n_features = data.shape[1]
+    cdef Py_ssize_t i, j, k, offset
+    cdef double tmp, d
+    cdef double[::1] distances = np.empty(n_samples * (n_samples - 1) // 2,
+                                          dtype=np.float64)
+    for i in range(n_samples):
+        # condensed_index(n_samples, i, j) is offset + j
+        offset = i * (2 * n_samples - i - 1) // 2 - i - 1
+        for j in range(i + 1, n_samples):
+            d = 0.0
+            for k in range(n_features):
+                tmp = data[i, k] - data[j, k]
+                d += tmp * tmp
+            distances[offset + j] = sqrt(d)
+    return np.asarray(distances)
+
+
 benchmarks = (
     pairwise_cython_for_loops,
+    pairwise_cython_condensed_for_loops,
 )
\ No newline at end of file
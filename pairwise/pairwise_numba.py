@@ -2,10 +2,12 @@
 # License: MIT
 
 from pairwise import pairwise_python
-from numba import autojit
+from artifact_cache import numba_jit
 
 
 benchmarks = (
     ("pairwise_numba_nested_for_loops",
-     autojit(pairwise_python.pairwise_python_nested_for_loops)),
+     numba_jit(pairwise_python.pairwise_python_nested_for_loops)),
+    ("pairwise_numba_condensed_for_loops",
+     numba_jit(pairwise_python.pairwise_python_condensed_for_loops)),
 )
@@ -37,9 +37,185 @@ def pairwise_python_numpy_dot(data):
     return dists
 
 
+def condensed_index(n_samples, i, j):
+    """Index of the distance between samples ``i`` and ``j`` (``i != j``)
+    in the condensed output of the ``pairwise_*_condensed_*`` variants
+
+    The condensed output only stores the ``n_samples * (n_samples - 1) / 2``
+    distances of the upper triangle, row by row, like
+    ``scipy.spatial.distance.pdist``. ``i`` and ``j`` can be arrays.
+    """
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    return i * (2 * n_samples - i - 1) // 2 + j - i - 1
+
+
+def pairwise_python_condensed_for_loops(data):
+    n_samples, n_features = data.shape
+    distances = np.empty(n_samples * (n_samples - 1) // 2, dtype=data.dtype)
+    #"omp parallel for private(offset, j, d, k, tmp)"
+    for i in range(n_samples):
+        # condensed_index(n_samples, i, j) is offset + j
+        offset = i * (2 * n_samples - i - 1) // 2 - i - 1
+        for j in range(i + 1, n_samples):
+            d = 0.0
+            for k in range(n_features):
+                tmp = data[i, k] - data[j, k]
+                d += tmp * tmp
+            distances[offset + j] = np.sqrt(d)
+    return distances
+
+
+def pairwise_python_condensed_numpy(data):
+    n_samples = data.shape[0]
+    distances = np.empty(n_samples * (n_samples - 1) // 2, dtype=data.dtype)
+    offset = 0
+    for i in range(n_samples - 1):
+        diff = data[i + 1:] - data[i]
+        row = distances[offset:offset + n_samples - i - 1]
+        np.sqrt(np.einsum('ij,ij->i', diff, diff), out=row)
+        offset += n_samples - i - 1
+    return distances
+
+
+# Size in bytes of the distance tiles of pairwise_python_tiled_numpy: small
+# enough for a tile and its two blocks of rows to stay in the last level
+# cache, and bounding the temporary memory whatever the number of samples
+TILE_BYTES = 2 ** 21
+
+
+def _block_size(dtype, tile_bytes):
+    return int(np.sqrt(tile_bytes // dtype.itemsize))
+
+
+def _squared_distance_tile(rows, row_norms, cols, col_norms, buffer):
+    # ||x - y||^2 = ||x||^2 - 2 x.y + ||y||^2 in a contiguous view of buffer
+    tile = buffer[:len(rows) * len(cols)].reshape(len(rows), len(cols))
+    np.dot(rows, cols.T, out=tile)
+    tile *= -2
+    tile += row_norms[:, None]
+    tile += col_norms[None, :]
+    # Rounding errors can make the squared distances of close samples
+    # negative
+    np.maximum(tile, 0, out=tile)
+    return tile
+
+
+def pairwise_python_tiled_numpy(data, out=None, block_size=None,
+                                tile_bytes=TILE_BYTES):
+    """Compute the distances tile by tile with one matrix product per tile
+
+    ``out`` is the output array, or the filename of a memory-mapped output
+    for problems that do not fit in memory. Only the upper triangle of
+    tiles is computed, the lower one is its transpose.
+    """
+    n_samples, n_features = data.shape
+    dtype = data.dtype
+    if out is None:
+        out = np.empty((n_samples, n_samples), dtype=dtype)
+    elif isinstance(out, str):
+        out = np.memmap(out, dtype=dtype, mode='w+',
+                        shape=(n_samples, n_samples))
+    if block_size is None:
+        block_size = _block_size(dtype, tile_bytes)
+    block_size = max(1, min(block_size, n_samples))
+
+    norms = np.einsum('ij,ij->i', data, data)
+    buffer = np.empty(block_size * block_size, dtype=dtype)
+    for i in range(0, n_samples, block_size):
+        rows = data[i:i + block_size]
+        for j in range(i, n_samples, block_size):
+            cols = data[j:j + block_size]
+            tile = _squared_distance_tile(rows, norms[i:i + block_size],
+                                          cols, norms[j:j + block_size],
+                                          buffer)
+            if i == j:
+                np.fill_diagonal(tile, 0)
+            np.sqrt(tile, out=tile)
+            out[i:i + block_size, j:j + block_size] = tile
+            if i != j:
+                out[j:j + block_size, i:i + block_size] = tile.T
+    return out
+
+
+def pairwise_python_knn(queries, reference, k, block_size=None,
+                        tile_bytes=TILE_BYTES):
+    """Find the ``k`` nearest reference samples of each query
+
+    Blocks of queries are compared to blocks of the reference samples one
+    tile of distances at a time, keeping the running ``k`` nearest
+    candidates of each query: the memory used is ``O(n_queries * k)`` plus
+    a single tile.
+
+    Returns the ``(distances, indices)`` arrays of shape ``(n_queries, k)``
+    of the neighbours of each query, sorted by increasing distance.
+    """
+    n_queries = queries.shape[0]
+    n_reference = reference.shape[0]
+    if not 0 < k <= n_reference:
+        raise ValueError("k must be between 1 and the number of reference"
+                         " samples %d, got %r" % (n_reference, k))
+    dtype = np.result_type(queries, reference)
+    if block_size is None:
+        block_size = _block_size(dtype, tile_bytes)
+    block_size = max(1, min(block_size, max(n_queries, n_reference)))
+
+    query_norms = np.einsum('ij,ij->i', queries, queries)
+    reference_norms = np.einsum('ij,ij->i', reference, reference)
+    buffer = np.empty(block_size * block_size, dtype=dtype)
+    distances = np.empty((n_queries, k), dtype=dtype)
+    indices = np.empty((n_queries, k), dtype=np.intp)
+    for i in range(0, n_queries, block_size):
+        rows = queries[i:i + block_size]
+        best_distances = np.empty((len(rows), 0), dtype=dtype)
+        best_indices = np.empty((len(rows), 0), dtype=np.intp)
+        for j in range(0, n_reference, block_size):
+            cols = reference[j:j + block_size]
+            tile = _squared_distance_tile(rows, query_norms[i:i + block_size],
+                                          cols,
+                                          reference_norms[j:j + block_size],
+                                          buffer)
+            # Merge the candidates of the tile with the running ones
+            candidates = np.hstack([best_distances, tile])
+            candidate_indices = np.hstack([
+                best_indices,
+                np.broadcast_to(np.arange(j, j + len(cols)), tile.shape)])
+            if candidates.shape[1] > k:
+                selected = np.argpartition(candidates, k - 1, axis=1)[:, :k]
+                candidates = np.take_along_axis(candidates, selected, axis=1)
+                candidate_indices = np.take_along_axis(candidate_indices,
+                                                       selected, axis=1)
+            best_distances, best_indices = candidates, candidate_indices
+        order = np.argsort(best_distances, axis=1)
+        np.sqrt(np.take_along_axis(best_distances, order, axis=1),
+                out=distances[i:i + block_size])
+        indices[i:i + block_size] = np.take_along_axis(best_indices, order,
+                                                       axis=1)
+    return distances, indices
+
+
+# Number of neighbours of the k-nearest neighbours benchmarks
+KNN_K = 10
+
+
+def pairwise_python_knn_streaming(data, k=KNN_K):
+    return pairwise_python_knn(data, data, k)
+
+
+def pairwise_python_knn_full_sort(data, k=KNN_K):
+    # Baseline: compute the full distance matrix then sort each row
+    distances = pairwise_python_tiled_numpy(data)
+    indices = np.argsort(distances, axis=1)[:, :k]
+    return np.take_along_axis(distances, indices, axis=1), indices
+
+
 benchmarks = (
     pairwise_python_nested_for_loops,
     pairwise_python_inner_numpy,
     pairwise_python_broadcast_numpy,
     pairwise_python_numpy_dot,
+    pairwise_python_tiled_numpy,
+    pairwise_python_condensed_for_loops,
+    pairwise_python_condensed_numpy,
+    pairwise_python_knn_streaming,
+    pairwise_python_knn_full_sort,
 )
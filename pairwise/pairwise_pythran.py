@@ -2,33 +2,43 @@
 # License: MIT
 
 from pairwise import pairwise_python
-from pythran import compile_pythrancode
+import artifact_cache
 from inspect import getsource
+from timeit import default_timer
 import re
-import imp
 
 # grab imports
 imports = 'import numpy as np'
-exports = '#pythran export pairwise_python_nested_for_loops(float[][])'
+exports = '\n'.join([
+    '#pythran export pairwise_python_nested_for_loops(float[][])',
+    '#pythran export pairwise_python_condensed_for_loops(float[][])',
+])
 modname = 'pairwise_pythran'
 
-# grab the source from the original function
-source = getsource(pairwise_python.pairwise_python_nested_for_loops)
+# grab the source from the original functions
+source = '\n'.join([
+    getsource(pairwise_python.pairwise_python_nested_for_loops),
+    getsource(pairwise_python.pairwise_python_condensed_for_loops),
+])
 
 # a few rewriting rules to prune unsupported features
 source = re.sub(r'dtype=data.dtype', 'np.double', source)
 source = re.sub(r'#"omp', '"omp', source)
 
-# compile to a native module
-native = compile_pythrancode(modname,
-                             '\n'.join([imports, exports, source]),
-                             cxxflags=['-O2', '-fopenmp']
-                             )
-
-# load it
-native = imp.load_dynamic(modname, native)
+# compile to a native module, or load it from the artifact cache
+tic = default_timer()
+native = artifact_cache.load_pythran(modname,
+                                     '\n'.join([imports, exports, source]),
+                                     cxxflags=['-O2', '-fopenmp'])
+compile_time = default_timer() - tic
 
 benchmarks = (
     ("pairwise_pythran_nested_for_loops",
      native.pairwise_python_nested_for_loops),
+    ("pairwise_pythran_condensed_for_loops",
+     native.pairwise_python_condensed_for_loops),
 )
+
+# Time spent building the native module (or loading it from the artifact
+# cache), reported by run_benchmarks.py
+compile_times = dict((name, compile_time) for name, _ in benchmarks)
@@ -2,6 +2,10 @@
 # License: MIT
 import theano
 import theano.tensor as TT
+from timeit import default_timer
+
+# Time spent compiling each theano function, reported by run_benchmarks.py
+compile_times = {}
 
 
 def pairwise_theano_tensor_prepare(dtype):
@@ -11,9 +15,11 @@ def pairwise_theano_tensor_prepare(dtype):
             TT.sqr(X[:, None, :] - X),
             axis=2))
     name = 'pairwise_theano_broadcast_' + dtype
+    tic = default_timer()
     rval = theano.function([X],
                            theano.Out(dists, borrow=True),
                            allow_input_downcast=True, name=name)
+    compile_times[name] = default_timer() - tic
     rval.__name__ = name
     return rval
 
@@ -23,9 +29,11 @@ def pairwise_theano_blas_prepare(dtype):
     X_norm_2 = (X ** 2).sum(axis=1)
     dists = TT.sqrt(2 * X_norm_2 - TT.dot(X, X.T))
     name = 'pairwise_theano_blas_' + dtype
+    tic = default_timer()
     rval = theano.function([X],
                            theano.Out(dists, borrow=True),
                            allow_input_downcast=True, name=name)
+    compile_times[name] = default_timer() - tic
     rval.__name__ = name
     return rval
 
@@ -15,3 +15,17 @@ def make_env(N=1000000):
     rng = np.random.RandomState(42)
     x = rng.rand(N)
     return (x,), {}
+
+
+# Geometric range of problem sizes used by ``run_benchmarks.py --sweep``
+sweep_sizes = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+
+def make_sweep_env(size):
+    """Build the environment of a problem of dimension ``size``."""
+    return make_env(N=size)
+
+
+def make_small_env():
+    """Build the tiny problem used by ``run_benchmarks.py --overhead``."""
+    return make_env(N=3)
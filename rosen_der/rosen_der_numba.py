@@ -2,11 +2,21 @@
 # License: MIT
 
 from rosen_der import rosen_der_python
-from numba import autojit
+from artifact_cache import numba_jit
 
 
 # segfaults...
 #benchmarks = (
 #    ("rosen_der_numba",
-#     autojit(rosen_der_python.rosen_der_python)),
+#     numba_jit(rosen_der_python.rosen_der_python)),
 #)
+
+benchmarks = (
+    ("rosen_der_numba_optimizer",
+     rosen_der_python.optimizer_loop(
+         numba_jit(rosen_der_python.rosen_value_and_der_python))),
+)
+
+benchmark_metrics = {
+    'rosen_der_numba_optimizer': rosen_der_python.optimizer_metrics,
+}
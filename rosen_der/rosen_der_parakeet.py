@@ -6,5 +6,12 @@ from parakeet import jit
 
 benchmarks = (
      ("rosen_der_loops_parakeet", jit(rosen_der_python.rosen_der_python)),
-     ("rosen_der_numpy_parakeet", jit(rosen_der_python.rosen_der_numpy))
+     ("rosen_der_numpy_parakeet", jit(rosen_der_python.rosen_der_numpy)),
+     ("rosen_der_parakeet_optimizer",
+      rosen_der_python.optimizer_loop(
+          jit(rosen_der_python.rosen_value_and_der_numpy))),
  )
+
+benchmark_metrics = {
+    'rosen_der_parakeet_optimizer': rosen_der_python.optimizer_metrics,
+}
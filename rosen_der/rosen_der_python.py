@@ -1,6 +1,9 @@
 # Authors: Travis E. Oliphant (numpy version), Serge Guelton (python version)
 # License: BSD
 # Source: https://github.com/scipy/scipy/blob/master/scipy/optimize/optimize.py
+import functools
+import itertools
+
 import numpy
 
 
@@ -30,4 +33,194 @@ def rosen_der_python(x):
     der[-1] = 200 * (x[-1] - x[-2] ** 2)
     return der
 
-benchmarks = (rosen_der_numpy, rosen_der_python)
+
+def rosen_value_and_der_numpy(x):
+    a = x[1:] - x[:-1] ** 2
+    b = 1 - x[:-1]
+    value = numpy.sum(100 * a ** 2 + b ** 2)
+    der = numpy.zeros_like(x)
+    der[:-1] = -400 * x[:-1] * a - 2 * b
+    der[1:] += 200 * a
+    return value, der
+
+
+def rosen_value_and_der_python(x):
+    n = x.shape[0]
+    der = numpy.zeros_like(x)
+    value = 0.
+
+    for i in range(n - 1):
+        a = x[i + 1] - x[i] ** 2
+        b = 1 - x[i]
+        value += 100 * a * a + b * b
+        der[i] += -400 * x[i] * a - 2 * b
+        der[i + 1] += 200 * a
+    return value, der
+
+
+# Number of steps of the optimizer benchmarks
+OPTIMIZER_ITERATIONS = 100
+
+
+def optimize(value_and_der, x0, n_iterations=OPTIMIZER_ITERATIONS, step=1e-4):
+    """Minimize the Rosenbrock function by gradient descent from x0
+
+    Each step calls ``value_and_der`` once: the step size grows after the
+    moves decreasing the value, and the other moves are rejected with a
+    smaller step, like a crude line search.
+    """
+    x = x0
+    value, der = value_and_der(x)
+    for _ in range(n_iterations):
+        x_new = x - step * der
+        value_new, der_new = value_and_der(x_new)
+        if value_new <= value:
+            x, value, der = x_new, value_new, der_new
+            step *= 1.5
+        else:
+            step *= 0.5
+    return x
+
+
+def _optimize_args(x0, n_iterations=OPTIMIZER_ITERATIONS, step=1e-4):
+    # value_and_der is called with vectors like x0
+    return (x0,)
+
+# Lets run_benchmarks.py compile the value_and_der of the optimizer
+# benchmarks ahead of their first call
+optimize.wrapped_args = _optimize_args
+
+
+def optimizer_loop(value_and_der):
+    """Benchmark running the optimizer with the value_and_der backend, to
+    measure its call overhead on top of its throughput"""
+    return functools.partial(optimize, value_and_der)
+
+
+# Number of elements of the chunks of rosen_der_numpy_fused: small enough
+# for the scratch buffer and the chunks of x and der to stay in cache
+CHUNK_SIZE = 2 ** 13
+
+
+def rosen_der_numpy_fused(x, out=None, scratch=None, chunk_size=CHUNK_SIZE):
+    """Same as rosen_der_numpy, computed chunk by chunk with in-place ufuncs
+
+    ``x`` is a vector or a 2-D stack of vectors (one gradient per row). The
+    gradient is written into ``out`` when given, and the only temporary is
+    the ``scratch`` buffer of ``chunk_size`` elements, which can be passed
+    to make a call allocation free.
+    """
+    if x.ndim not in (1, 2):
+        raise ValueError("x must be a vector or a 2-D stack of vectors, got"
+                         " %d dimensions" % x.ndim)
+    if out is None:
+        out = numpy.empty_like(x)
+    if scratch is None:
+        scratch = numpy.empty(chunk_size, dtype=x.dtype)
+    elif (scratch.ndim != 1 or scratch.size == 0 or
+            not scratch.flags.c_contiguous):
+        raise ValueError("scratch must be a non-empty contiguous vector")
+    # chunks are blocks of rows and columns of a 2-D view
+    x2 = x if x.ndim == 2 else x[numpy.newaxis]
+    out2 = out if out.ndim == 2 else out[numpy.newaxis]
+    n_rows, n = x2.shape
+    row_step = max(1, min(n_rows, scratch.size))
+    step = scratch.size // row_step
+    for row_start, start in itertools.product(range(0, n_rows, row_step),
+                                              range(1, n - 1, step)):
+        rows = slice(row_start, row_start + row_step)
+        stop = min(start + step, n - 1)
+        xm = x2[rows, start:stop]
+        xm_m1 = x2[rows, start - 1:stop - 1]
+        xm_p1 = x2[rows, start + 1:stop + 1]
+        der = out2[rows, start:stop]
+        tmp = scratch[:xm.size].reshape(xm.shape)
+        # der = 200 * (xm - xm_m1 ** 2)
+        numpy.multiply(xm_m1, xm_m1, out=der)
+        numpy.subtract(xm, der, out=der)
+        der *= 200
+        # der -= 400 * (xm_p1 - xm ** 2) * xm
+        numpy.multiply(xm, xm, out=tmp)
+        numpy.subtract(xm_p1, tmp, out=tmp)
+        tmp *= xm
+        tmp *= 400
+        der -= tmp
+        # der -= 2 * (1 - xm)
+        numpy.subtract(1, xm, out=tmp)
+        tmp *= 2
+        der -= tmp
+    out[..., 0] = (-400 * x[..., 0] * (x[..., 1] - x[..., 0] ** 2)
+                   - 2 * (1 - x[..., 0]))
+    out[..., -1] = 200 * (x[..., -1] - x[..., -2] ** 2)
+    return out
+
+
+def preallocated(func):
+    """Benchmark calling func with output and scratch buffers allocated at
+    the first call for each shape, like an optimizer would"""
+    buffers = {}
+
+    def call(x):
+        key = (x.shape, x.dtype.str)
+        if key not in buffers:
+            buffers[key] = (numpy.empty_like(x),
+                            numpy.empty(CHUNK_SIZE, dtype=x.dtype))
+        out, scratch = buffers[key]
+        return func(x, out=out, scratch=scratch)
+    return call
+
+
+# Number of vectors of the batched benchmark
+BATCH_SIZE = 8
+
+
+def rosen_der_numpy_fused_batched(x):
+    """Gradients of BATCH_SIZE problems, the rows of x reshaped"""
+    # at least 2 variables per problem
+    n_rows = min(BATCH_SIZE, x.shape[0] // 2)
+    n = x.shape[0] - x.shape[0] % n_rows
+    return rosen_der_numpy_fused(x[:n].reshape(n_rows, -1))
+
+
+def memory_traffic_metrics(record, args, kwargs):
+    """Memory traffic of a call: the compulsory traffic of reading x and
+    writing the gradient, the effective bandwidth and the bytes of the
+    temporaries allocated on top of the gradient"""
+    x, = args
+    compulsory_bytes = 2 * x.nbytes
+    metrics = {
+        'compulsory_bytes': compulsory_bytes,
+        'bandwidth_gb_per_s': compulsory_bytes / record['warm_time'] / 1e9,
+    }
+    if record.get('allocated_bytes') is not None:
+        # the gradient has the size of x
+        metrics['temporary_bytes'] = max(
+            0, record['allocated_bytes'] - x.nbytes)
+    return metrics
+
+
+def optimizer_metrics(record, args, kwargs):
+    """Time of an optimizer step, a call of the value and gradient"""
+    return {'iteration_time': record['warm_time'] / (OPTIMIZER_ITERATIONS + 1)}
+
+
+benchmarks = (
+    rosen_der_numpy,
+    rosen_der_python,
+    rosen_der_numpy_fused,
+    ("rosen_der_numpy_fused_preallocated",
+     preallocated(rosen_der_numpy_fused)),
+    rosen_der_numpy_fused_batched,
+    ("rosen_der_numpy_optimizer", optimizer_loop(rosen_value_and_der_numpy)),
+)
+
+# Extra metrics of the benchmarks, added to their records by
+# run_benchmarks.py
+benchmark_metrics = {
+    'rosen_der_numpy': memory_traffic_metrics,
+    'rosen_der_python': memory_traffic_metrics,
+    'rosen_der_numpy_fused': memory_traffic_metrics,
+    'rosen_der_numpy_fused_preallocated': memory_traffic_metrics,
+    'rosen_der_numpy_fused_batched': memory_traffic_metrics,
+    'rosen_der_numpy_optimizer': optimizer_metrics,
+}
@@ -4,6 +4,11 @@
 # Source: https://github.com/scipy/scipy/blob/master/scipy/optimize/optimize.py
 import theano
 from theano import tensor as TT
+from timeit import default_timer
+from rosen_der import rosen_der_python
+
+# Time spent compiling each theano function, reported by run_benchmarks.py
+compile_times = {}
 
 
 def rosen_der_theano_prepare(dtype):
@@ -23,9 +28,34 @@ def rosen_der_theano_prepare(dtype):
     der = TT.set_subtensor(
         der[-1],
         200 * (x[-1] - x[-2] ** 2))
+    name = 'rosen_der_theano_' + dtype
+    tic = default_timer()
     rval = theano.function([x], der, allow_input_downcast=True)
-    rval.__name__ = 'rosen_der_theano_' + dtype
+    compile_times[name] = default_timer() - tic
+    rval.__name__ = name
     return rval
 
+
+def rosen_value_and_der_theano_prepare(dtype):
+    x = TT.vector(dtype=dtype)
+    a = x[1:] - x[:-1] ** 2
+    b = 1 - x[:-1]
+    value = TT.sum(100 * a ** 2 + b ** 2)
+    der = TT.zeros_like(x)
+    der = TT.inc_subtensor(der[:-1], -400 * x[:-1] * a - 2 * b)
+    der = TT.inc_subtensor(der[1:], 200 * a)
+    name = 'rosen_der_theano_optimizer_' + dtype
+    tic = default_timer()
+    rval = theano.function([x], [value, der], allow_input_downcast=True)
+    compile_times[name] = default_timer() - tic
+    return name, rosen_der_python.optimizer_loop(rval)
+
 benchmarks = (rosen_der_theano_prepare('float32'),
-              rosen_der_theano_prepare('float64'))
+              rosen_der_theano_prepare('float64'),
+              rosen_value_and_der_theano_prepare('float32'),
+              rosen_value_and_der_theano_prepare('float64'))
+
+benchmark_metrics = {
+    'rosen_der_theano_optimizer_float32': rosen_der_python.optimizer_metrics,
+    'rosen_der_theano_optimizer_float64': rosen_der_python.optimizer_metrics,
+}
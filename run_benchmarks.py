@@ -3,19 +3,35 @@
 from __future__ import print_function
 
 import argparse
+import ast
+import fnmatch
+from functools import partial
 try:
     from collections import OrderedDict
 except:
     from ordereddict import OrderedDict
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+import hashlib
 import json
 import os
+import re
+import subprocess
+import sys
+import threading
 import traceback
-from time import time
+try:
+    # Monotonic high resolution clock
+    from time import perf_counter as default_timer
+except ImportError:
+    from timeit import default_timer
 import logging
 
-from jinja2 import Template
 import numpy as np
-import matplotlib.pyplot as plt
+
+import artifact_cache
 
 # imports for machine stats 
 import multiprocessing 
@@ -24,6 +40,16 @@ import platform
 # use this to check whether benchmark needs warmup
 from types import FunctionType 
 
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    from memory_profiler import memory_usage
+except ImportError:
+    memory_usage = None
+
 try:
     # Use automated Cython support when available
     import pyximport
@@ -35,6 +61,7 @@ log = logging.getLogger("run_benchmarks")
 
 REPORT_FILENAME = 'report/index.html'
 DATA_FILENAME = 'report/benchmark_results.json'
+CACHE_FILENAME = 'report/benchmark_cache.json'
 
 GROUP_URL_PATTERN = ("https://github.com/numfocus/python-benchmarks/"
                      "tree/master/%s")
@@ -52,34 +79,191 @@ MAIN_REPORT_TEMPLATE_FILENAME = "templates/index.html"
 
 LOG_FORMAT = '%(asctime)s %(levelname)-8s %(name)-8s %(message)s'
 
+# Interpreters used to run the modules of a given platform in worker
+# processes. Other platforms run under the interpreter of this script.
+DEFAULT_INTERPRETERS = {
+    'pypy': 'pypy',
+}
 
-def find_benchmarks(folders=None, platforms=None):
-    """Collect benchmarks collable and shared environment initializers."""
+# Maximum duration in seconds of a worker process running a single module
+WORKER_TIMEOUT = 3600
 
-    benchmark_groups = []
+# Maximum expected duration in seconds of a single call during size sweeps
+SWEEP_TIME_LIMIT = 60
 
-    if folders is None:
-        here = os.path.dirname(os.path.abspath(__file__))
-        dir_content = os.listdir(here)
-        folders = [f for f in dir_content
-                   if (os.path.isdir(f) and
-                       os.path.exists(os.path.join(f, '__init__.py')))]
-        folders.sort()
+# tracemalloc slows pure Python code down about ten fold: the allocations of
+# calls slower than this number of seconds are not traced
+TRACEMALLOC_TIME_LIMIT = 0.1
 
-    for folder in folders:
-        group_name = os.path.basename(folder)
-        collected_benchmarks = []
-        modules_in_error = []
+# Call overhead: benchmarks are called one by one on the tiny problem of
+# their group (``make_small_env``) OVERHEAD_CALLS times, or until
+# OVERHEAD_BUDGET seconds are spent
+OVERHEAD_CALLS = 10000
+OVERHEAD_BUDGET = 5.
 
-        pkg = __import__(group_name, fromlist="dummy")
+# Bump to invalidate all the cached results. The source of this script is
+# also part of the keys: changing how records are measured invalidates them
+CACHE_VERSION = 1
+
+# Libraries whose version is part of the cache key of every module
+KEY_LIBRARIES = ('numpy', 'scipy', 'cython', 'numba', 'llvmlite', 'parakeet',
+                 'theano', 'pythran', 'pyopencl')
+
+# Timing: fast calls are repeated in an inner loop so that each timing sample
+# lasts at least MIN_SAMPLE_TIME seconds. Samples are collected until the 95%
+# confidence interval of the median is within TIMING_PRECISION of the median
+# (with at least MIN_RUNS and at most MAX_RUNS samples) or until the
+# TIMING_BUDGET in seconds is spent.
+MIN_SAMPLE_TIME = 1e-3
+MIN_RUNS = 5
+MAX_RUNS = 100
+TIMING_PRECISION = 0.02
+TIMING_BUDGET = 10.
+
+
+def find_benchmark_folders():
+    """List the benchmark group folders next to this script."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    folders = [f for f in os.listdir(here)
+               if (os.path.isdir(os.path.join(here, f)) and
+                   os.path.exists(os.path.join(here, f, '__init__.py')))]
+    folders.sort()
+    return folders
+
+
+def _split_entries(text):
+    # Split the content of a tuple literal at its top-level commas
+    entries = []
+    depth = 0
+    current = []
+    for char in text:
+        if char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth -= 1
+        if char == ',' and depth == 0:
+            entries.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    entries.append(''.join(current).strip())
+    return [e for e in entries if e]
+
+
+def _scan_benchmarks_text(source):
+    # Fallback for Cython sources and modules the ast module cannot parse
+    match = re.search(r'^benchmarks\s*=\s*[(\[]', source, re.MULTILINE)
+    if match is None:
+        return []
+    depth = 1
+    for end in range(match.end(), len(source)):
+        if source[end] in '([{':
+            depth += 1
+        elif source[end] in ')]}':
+            depth -= 1
+            if depth == 0:
+                break
+    names = []
+    for entry in _split_entries(source[match.end():end]):
+        if entry.startswith('('):
+            entry = _split_entries(entry[1:-1])[0]
+        names.append(entry.strip('\'"'))
+    return names
 
-        benchmark_groups.append(OrderedDict([
-            ('name', group_name),
-            ('make_env', getattr(pkg, 'make_env', None)),
-            ('benchmarks', collected_benchmarks),
-            ('import_errors', modules_in_error),
-        ]))
 
+def _literal(node):
+    if hasattr(ast, 'Constant') and isinstance(node, ast.Constant):
+        return node.value
+    return getattr(node, 's', getattr(node, 'n', None))
+
+
+def _benchmark_label(node):
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Tuple) and len(node.elts) == 2:
+        return _literal(node.elts[0])
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        # The name is only known at runtime, e.g. theano functions
+        args = []
+        for arg in node.args:
+            value = _literal(arg)
+            args.append(repr(value) if value is not None else '...')
+        return "%s(%s)" % (node.func.id, ', '.join(args))
+    return None
+
+
+def scan_benchmarks(module_path):
+    """List the benchmarks of a module without importing it
+
+    The entries of the module level ``benchmarks`` tuple are read from the
+    source: functions give their name and ``(name, func)`` pairs their
+    name. Benchmarks whose name is only known at runtime (e.g. built by a
+    function call) are labelled with the expression that builds them.
+    """
+    with open(module_path, 'rb') as f:
+        source = f.read().decode('utf-8', 'replace')
+    if not module_path.endswith('.py'):
+        return _scan_benchmarks_text(source)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return _scan_benchmarks_text(source)
+
+    names = []
+    for statement in tree.body:
+        if not isinstance(statement, ast.Assign):
+            continue
+        targets = [t.id for t in statement.targets
+                   if isinstance(t, ast.Name)]
+        if ('benchmarks' in targets and
+                isinstance(statement.value, (ast.Tuple, ast.List))):
+            names = [_benchmark_label(node) or '?'
+                     for node in statement.value.elts]
+    return names
+
+
+def match_benchmark(name, select=None):
+    """Check whether a benchmark name matches any of the select patterns"""
+    if select is None:
+        return True
+    return any(fnmatch.fnmatch(name, pattern) for pattern in select)
+
+
+def is_runtime_label(label):
+    """Check whether a label of ``scan_benchmarks`` is not a benchmark name
+
+    Such labels are the expression building the benchmark (or '?'): its
+    name is only known once its module is imported.
+    """
+    return label == '?' or '(' in label
+
+
+def match_label(label, select=None):
+    """Check whether a statically scanned benchmark may match ``select``
+
+    Labels whose name is only known at import always match: the module is
+    then imported and its benchmarks filtered on their real names by
+    ``find_benchmarks``.
+    """
+    return is_runtime_label(label) or match_benchmark(label, select)
+
+
+def find_benchmark_modules(folders=None, platforms=None, select=None):
+    """List the benchmark modules of each group without importing them.
+
+    Returns an ordered mapping from group name to a list of
+    ``(module_name, platform_name, module_filename)`` tuples. Modules whose
+    statically scanned benchmarks (see ``scan_benchmarks``) do not match any
+    of the ``select`` patterns are left out.
+    """
+    if folders is None:
+        folders = find_benchmark_folders()
+
+    benchmark_modules = OrderedDict()
+    for folder in folders:
+        group_name = os.path.basename(folder)
+        group_modules = benchmark_modules.setdefault(group_name, [])
+        seen = set()
         for module_filename in sorted(os.listdir(folder)):
             module_name, ext = os.path.splitext(module_filename)
             if ext and ext not in ('.py', '.so', '.dll', '.pyx'):
@@ -88,14 +272,90 @@ def find_benchmarks(folders=None, platforms=None):
             if not module_name.startswith(group_name + "_"):
                 continue
 
+            # Compiled extensions sit next to their .pyx source
+            if module_name in seen:
+                continue
+            seen.add(module_name)
+
             platform_name = module_name[len(group_name) + 1:]
             if platforms is not None and platform_name not in platforms:
                 continue
 
+            names = scan_benchmarks(os.path.join(folder, module_filename))
+            if not any(match_label(name, select) for name in names):
+                continue
+
+            group_modules.append((module_name, platform_name,
+                                  module_filename))
+    return benchmark_modules
+
+
+def _stats_delta(before, after):
+    return dict((k, after[k] - before.get(k, 0)) for k in after)
+
+
+def _artifact_cache_status(*deltas):
+    if any(delta.get('misses') for delta in deltas):
+        return 'miss'
+    if any(delta.get('hits') for delta in deltas):
+        return 'hit'
+    return None
+
+
+def find_benchmarks(folders=None, platforms=None, select=None):
+    """Collect benchmarks collable and shared environment initializers.
+
+    Only the modules with benchmarks matching the ``select`` patterns are
+    imported. The import time of each module is collected by module source
+    in the ``import_times`` entry of its group, and the ``compile_times``
+    dict of the module of each benchmark by benchmark name in the
+    ``compile_times`` entry. The ``artifact_cache_stats`` entry holds the
+    artifact cache hits and misses of the import of each module, and the
+    ``metrics`` entry the function computing the extra metrics of each
+    benchmark, if any, from the ``benchmark_metrics`` dict of its module.
+    """
+
+    benchmark_groups = []
+    benchmark_modules = find_benchmark_modules(folders=folders,
+                                               platforms=platforms,
+                                               select=select)
+
+    for group_name, group_modules in benchmark_modules.items():
+        collected_benchmarks = []
+        modules_in_error = []
+        import_times = {}
+        compile_times = {}
+        artifact_cache_stats = {}
+        metrics = {}
+
+        pkg = __import__(group_name, fromlist="dummy")
+
+        benchmark_groups.append(OrderedDict([
+            ('name', group_name),
+            ('make_env', getattr(pkg, 'make_env', None)),
+            ('make_sweep_env', getattr(pkg, 'make_sweep_env', None)),
+            ('sweep_sizes', getattr(pkg, 'sweep_sizes', None)),
+            ('make_small_env', getattr(pkg, 'make_small_env', None)),
+            ('mutating', getattr(pkg, 'mutating', False)),
+            ('benchmarks', collected_benchmarks),
+            ('import_errors', modules_in_error),
+            ('import_times', import_times),
+            ('compile_times', compile_times),
+            ('artifact_cache_stats', artifact_cache_stats),
+            ('metrics', metrics),
+        ]))
+
+        for module_name, platform_name, module_filename in group_modules:
             abs_module_name = "%s.%s" % (group_name, module_name)
+            module_source = "%s/%s" % (group_name, module_filename)
 
+            stats_before = artifact_cache.current_stats()
+            tic = default_timer()
             try:
                 module = __import__(abs_module_name, fromlist="dummy")
+                import_times[module_source] = default_timer() - tic
+                artifact_cache_stats[module_source] = _stats_delta(
+                    stats_before, artifact_cache.current_stats())
             except Exception as e:
                 error_type = type(e).__name__
                 error_message = str(e)
@@ -107,125 +367,1058 @@ def find_benchmarks(folders=None, platforms=None):
                     ('error_type', error_type),
                     ('error_message', error_message),
                     ('traceback', tb),
+                    ('import_time', default_timer() - tic),
                 ])
                 modules_in_error.append(loading_error)
                 module = None
 
-            module_source = "%s/%s" % (group_name, module_filename)
             for benchmark in getattr(module, 'benchmarks', ()):
                 if callable(benchmark):
-                    collected_benchmarks.append(
-                        (module_source, benchmark.__name__, benchmark))
-                elif isinstance(benchmark, tuple) and len(benchmark) == 2:
-                    collected_benchmarks.append((module_source,) + benchmark)
-                else:
+                    benchmark = (benchmark.__name__, benchmark)
+                elif not (isinstance(benchmark, tuple) and
+                          len(benchmark) == 2):
                     raise ValueError("Found invalid benchmark %r in %s" %
                                      benchmark, module_name)
+                if match_benchmark(benchmark[0], select):
+                    collected_benchmarks.append((module_source,) + benchmark)
+                    # Modules record the time spent compiling their
+                    # benchmarks at import or on their first call
+                    compile_times[benchmark[0]] = getattr(
+                        module, 'compile_times', None)
+                    metrics[benchmark[0]] = getattr(
+                        module, 'benchmark_metrics', {}).get(benchmark[0])
     return benchmark_groups
 
 
 
-def run_benchmark(name, func, args, kwargs, memory=False, n_runs=5,
-                  slow_threshold=1):
-    """Call a function with the provided arguments"""
-    # TODO: find a way to use memory_profiler on non-python, builtin functions
-    def time_once():
-        tic = time()
-        func(*args, **kwargs)
-        toc = time()
-        return toc - tic
+def snapshot_inputs(args, kwargs):
+    """Copy the arrays of a benchmark environment
+
+    Returns a list of ``(array, copy)`` pairs: the copies are the
+    pre-allocated buffers ``restore_inputs`` restores the arrays from.
+    """
+    arrays = list(args) + list(kwargs.values())
+    return [(a, a.copy()) for a in arrays if isinstance(a, np.ndarray)]
+
+
+def restore_inputs(snapshot):
+    """Restore in place the arrays of a ``snapshot_inputs`` snapshot"""
+    for array, copy in snapshot:
+        np.copyto(array, copy)
+
+
+def inputs_changed(snapshot):
+    """Return the positions of the snapshot arrays that were modified"""
+    return [i for i, (array, copy) in enumerate(snapshot)
+            if not np.array_equal(array, copy)]
+
+
+def _nbytes(result):
+    if isinstance(result, np.ndarray):
+        return result.nbytes
+    if isinstance(result, (tuple, list)):
+        return sum(_nbytes(r) for r in result)
+    return 0
+
+
+def measure_memory(func, args, kwargs, restore=None, trace=True):
+    """Measure the memory used by a single call to ``func``
+
+    Returns a tuple ``(peak_rss, allocated_bytes, temporaries_ratio)``:
+
+    - ``peak_rss`` is the peak resident set size of the process during the
+      call in bytes, sampled with memory_profiler,
+    - ``allocated_bytes`` is the peak of the memory allocated by Python and
+      NumPy during the call as reported by tracemalloc,
+    - ``temporaries_ratio`` is the memory allocated at that peak on top of
+      the result itself, in result sizes (e.g. 2. for the equivalent of two
+      result-sized temporaries).
+
+    Values that cannot be measured on this interpreter are None (the peak
+    RSS without memory_profiler: the high-water mark of the process would
+    not be the one of the call), as well as
+    the allocations when ``trace`` is False.
+
+    When ``restore`` is given, it is called before each of the calls made to
+    measure the memory (see ``restore_inputs``).
+    """
+    peak_rss = allocated_bytes = temporaries_ratio = None
+
+    if memory_usage is not None:
+        if restore is not None:
+            restore()
+        usage = memory_usage((func, args, kwargs), interval=0.01,
+                             max_usage=True)
+        # Older versions of memory_profiler return a single item list
+        if isinstance(usage, list):
+            usage = max(usage)
+        peak_rss = int(usage * 2 ** 20)
+
+    if tracemalloc is not None and trace:
+        if restore is not None:
+            restore()
+        tracemalloc.start()
+        try:
+            baseline, _ = tracemalloc.get_traced_memory()
+            result = func(*args, **kwargs)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        allocated_bytes = peak - baseline
+        result_nbytes = _nbytes(result)
+        if result_nbytes > 0:
+            temporaries_ratio = max(
+                0., float(allocated_bytes - result_nbytes) / result_nbytes)
+
+    return peak_rss, allocated_bytes, temporaries_ratio
+
+
+def reject_outliers(samples):
+    """Drop the samples outside of Tukey's fences (1.5 IQR)"""
+    samples = np.asarray(samples)
+    if len(samples) < 4:
+        return samples
+    q1, q3 = np.percentile(samples, [25, 75])
+    iqr = q3 - q1
+    mask = (samples >= q1 - 1.5 * iqr) & (samples <= q3 + 1.5 * iqr)
+    return samples[mask]
+
+
+def median_confidence_interval(samples, z=1.96):
+    """Distribution-free confidence interval of the median
+
+    The bounds are the order statistics around the median whose ranks are
+    given by the normal approximation of the binomial distribution.
+    """
+    samples = np.sort(samples)
+    n = len(samples)
+    half_width = z * np.sqrt(n) / 2.
+    lower = int(max(0, np.floor(n / 2. - half_width)))
+    upper = int(min(n - 1, np.ceil(n / 2. + half_width) - 1))
+    return float(samples[lower]), float(samples[upper])
+
+
+def compile_numba(func, args, kwargs):
+    """Compile a numba dispatcher for the types of the arguments
+
+    Dispatchers wrapped by ``functools.partial`` (along with its positional
+    arguments) or by decorators setting ``__wrapped__`` are unwrapped first.
+    Benchmarks built as ``partial(wrapper, dispatcher)`` are compiled for
+    the arguments the wrapper calls the dispatcher with, as given by the
+    ``wrapped_args`` function attribute of the wrapper (called with the
+    other arguments of the wrapper).
+    """
+    while not hasattr(func, 'compile'):
+        if isinstance(func, partial) and not func.keywords:
+            wrapped_args = getattr(func.func, 'wrapped_args', None)
+            if wrapped_args is not None and func.args:
+                args = wrapped_args(*(func.args[1:] + tuple(args)))
+                func = func.args[0]
+            else:
+                args = func.args + tuple(args)
+                func = func.func
+        elif hasattr(func, '__wrapped__'):
+            func = func.__wrapped__
+        else:
+            return None
+    if kwargs:
+        return None
+    try:
+        import numba
+        signature = tuple(numba.typeof(arg) for arg in args)
+        tic = default_timer()
+        func.compile(signature)
+        return default_timer() - tic
+    except Exception as e:
+        # Let the first call report the actual error
+        log.debug("Could not compile %r ahead of the first call: %s", func, e)
+        return None
+
+
+# Platforms whose benchmarks can be compiled ahead of their first call. The
+# hooks are called with the function and its arguments and return the
+# compilation time, or None.
+COMPILE_HOOKS = {
+    'numba': compile_numba,
+}
+
+
+def run_benchmark(name, func, args, kwargs, memory=False, min_runs=MIN_RUNS,
+                  max_runs=MAX_RUNS, budget=TIMING_BUDGET,
+                  precision=TIMING_PRECISION,
+                  min_sample_time=MIN_SAMPLE_TIME, slow_threshold=1,
+                  compile_hook=None, compile_times=None, restore=None):
+    """Call a function with the provided arguments
+
+    The first call is reported as the cold time. Fast calls are then
+    repeated in an inner loop calibrated to last at least
+    ``min_sample_time`` and timing samples are collected until the
+    confidence interval of their median is narrower than ``precision``
+    (relative to the median). Calls slower than ``slow_threshold`` seconds
+    stop as soon as the time ``budget`` is spent, even with less than
+    ``min_runs`` samples. Outliers are rejected before computing the
+    statistics of the record.
+
+    The compilation time is reported separately from the first call:
+    ``compile_hook`` (see ``COMPILE_HOOKS``) compiles the function before
+    its first call, and ``compile_times`` is the dict where a module records
+    by benchmark name the time spent compiling at import or during the first
+    call. The cold time is the compilation time of the hook plus the first
+    call.
+
+    When ``memory`` is True, extra calls are made after the timed calls to
+    measure their memory usage (see ``measure_memory``). The allocations of
+    calls slower than ``TRACEMALLOC_TIME_LIMIT`` are not traced.
+
+    When ``restore`` is given, it is called before every call, outside of
+    the timed region, to give each call pristine inputs (see
+    ``restore_inputs``).
+    """
+    def time_calls(number):
+        if restore is None:
+            tic = default_timer()
+            for _ in range(number):
+                func(*args, **kwargs)
+            toc = default_timer()
+            return (toc - tic) / number
+        # Time the calls one by one to leave the restoration of the inputs
+        # out of the timings
+        total = 0.
+        for _ in range(number):
+            restore()
+            tic = default_timer()
+            func(*args, **kwargs)
+            total += default_timer() - tic
+        return total / number
+
+    if compile_times is None:
+        compile_times = {}
+    start = default_timer()
+    compile_time = None
+    if compile_hook is not None:
+        compile_time = compile_hook(func, args, kwargs)
+    compile_time_before = compile_times.get(name)
+    first_timing = time_calls(1)
+    first_call_time = first_timing
+    if compile_times.get(name) is not None:
+        compile_time = (compile_time or 0.) + compile_times[name]
+        if compile_times[name] != compile_time_before:
+            # Compiled lazily during the first call
+            first_call_time -= compile_times[name]
 
-    first_timing = time_once()
     # if we're running a user-defined pure Python function, assume there's no warmup
     if isinstance(func, FunctionType):
-        cold = None 
-        warm = first_timing
-        all_warm_timings = [first_timing]
+        cold = None
+        samples = [first_timing]
     else:
         # Give a warm/cold time for every benchmark, even if there's no JIT
-        # Take the best time of several runs for fast executions
-      other_timings = []
-      for i in range(n_runs - 1):
-        t = time_once()
-        other_timings.append(t)
+        cold = first_timing
+        if compile_hook is not None and compile_time is not None:
+            cold += compile_time
+        samples = []
 
-      all_warm_timings = other_timings
-      best_warm_timing = np.min(all_warm_timings)
-      cold = first_timing
-      warm = best_warm_timing
+    # Calibrate the inner loop of fast calls, the first timing might include
+    # some warmup
+    number = 1
+    call_time = first_timing
+    while call_time * number < min_sample_time:
+        number = min(number * 10, int(np.ceil(min_sample_time /
+                                              max(call_time, 1e-9))))
+        call_time = time_calls(number)
+    if number > 1:
+        samples = []
 
-    return OrderedDict([
+    while len(samples) < max_runs:
+        if len(samples) >= min_runs:
+            kept = reject_outliers(samples)
+            lower, upper = median_confidence_interval(kept)
+            if (upper - lower) / 2. <= precision * np.median(kept):
+                break
+        elapsed = default_timer() - start
+        if samples and elapsed >= budget and (
+                len(samples) >= min_runs or
+                np.median(samples) * number >= slow_threshold):
+            break
+        samples.append(time_calls(number))
+
+    kept = reject_outliers(samples)
+    q1, median, q3 = np.percentile(kept, [25, 50, 75])
+    record = OrderedDict([
         ('name', name),
         ('cold_time', cold),
-        ('warm_time', warm),
-        ('all_warm_times', all_warm_timings),
-        ('std_warm_times', np.std(all_warm_timings)),
+        ('compile_time', compile_time),
+        ('first_call_time', first_call_time),
+        ('warm_time', float(median)),
+        ('best_warm_time', float(np.min(kept))),
+        ('iqr_warm_time', float(q3 - q1)),
+        ('ci_warm_time', median_confidence_interval(kept)),
+        ('all_warm_times', [float(s) for s in samples]),
+        ('std_warm_times', float(np.std(kept))),
+        ('n_outliers', len(samples) - len(kept)),
+        ('n_inner_calls', number),
+    ])
+    if memory:
+        peak_rss, allocated_bytes, temporaries_ratio = measure_memory(
+            func, args, kwargs, restore=restore,
+            trace=record['warm_time'] <= TRACEMALLOC_TIME_LIMIT)
+        record['peak_rss'] = peak_rss
+        record['allocated_bytes'] = allocated_bytes
+        record['temporaries_ratio'] = temporaries_ratio
+    return record
+
+
+def measure_call_overhead(func, args, kwargs, n_calls=OVERHEAD_CALLS,
+                          budget=OVERHEAD_BUDGET, restore=None):
+    """Time the calls of a function on a tiny problem one by one
+
+    The work done on such problems is negligible: the per-call latency is
+    dominated by the cost of crossing the boundary between Python and the
+    compiled code (argument checks and conversions, dispatch on the types,
+    buffer allocations...). A first call, not timed, compiles the function
+    for the types of the tiny problem if needed.
+
+    Returns the median and 99th percentile of the call times and the number
+    of calls.
+    """
+    if restore is not None:
+        restore()
+    func(*args, **kwargs)
+    samples = []
+    start = default_timer()
+    while len(samples) < n_calls:
+        if restore is not None:
+            restore()
+        tic = default_timer()
+        func(*args, **kwargs)
+        toc = default_timer()
+        samples.append(toc - tic)
+        if toc - start >= budget:
+            break
+    median, p99 = np.percentile(samples, [50, 99])
+    return float(median), float(p99), len(samples)
+
+
+def physical_memory():
+    """Total physical memory in bytes, None when it cannot be determined."""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _extrapolate(sizes, values, size):
+    # Assume the growth between the last two measurements goes on, and at
+    # least linearly
+    exponent = 1.
+    if len(values) >= 2 and values[-2] > 0 and values[-1] > 0:
+        exponent = max(exponent, np.log(values[-1] / values[-2]) /
+                       np.log(float(sizes[-1]) / sizes[-2]))
+    return values[-1] * (float(size) / sizes[-1]) ** exponent
+
+
+def fit_scaling_exponent(sizes, times):
+    """Fit ``time ~ size ** exponent`` and return the exponent"""
+    points = [(s, t) for s, t in zip(sizes, times) if t > 0]
+    if len(points) < 2:
+        return None
+    sizes, times = zip(*points)
+    return float(np.polyfit(np.log(sizes), np.log(times), 1)[0])
+
+
+def run_sweep(name, func, make_sweep_env, sizes, memory=False,
+              time_limit=SWEEP_TIME_LIMIT, memory_limit=None,
+              mutating=False):
+    """Benchmark a function on a range of problem sizes
+
+    Sizes are run in increasing order. The sweep stops as soon as the
+    duration of a call (or its allocated memory) extrapolated from the
+    previous sizes exceeds ``time_limit`` (or ``memory_limit``, by default
+    the physical memory of the machine).
+    """
+    if memory_limit is None:
+        memory_limit = physical_memory()
+
+    points = []
+    for size in sorted(sizes):
+        if points:
+            measured_sizes = [p['size'] for p in points]
+            expected_time = _extrapolate(
+                measured_sizes, [p['warm_time'] for p in points], size)
+            if expected_time > time_limit:
+                log.info("%s: skipping sizes from %s: expected %0.1fs",
+                         name, size, expected_time)
+                break
+            allocated = [p.get('allocated_bytes') for p in points]
+            if memory_limit and None not in allocated:
+                expected_memory = _extrapolate(measured_sizes, allocated,
+                                               size)
+                if expected_memory > memory_limit:
+                    log.info("%s: skipping sizes from %s: expected %0.1fMB",
+                             name, size, expected_memory / 1e6)
+                    break
+
+        args, kwargs = make_sweep_env(size)
+        restore = None
+        if mutating:
+            snapshot = snapshot_inputs(args, kwargs)
+            restore = lambda: restore_inputs(snapshot)
+        record = run_benchmark(name, func, args, kwargs, memory=memory,
+                               restore=restore)
+        point = OrderedDict([
+            ('size', size),
+            ('cold_time', record['cold_time']),
+            ('warm_time', record['warm_time']),
+        ])
+        if memory:
+            point['allocated_bytes'] = record['allocated_bytes']
+        points.append(point)
+        log.info("%s: size %s: warm: %s", name, size, record['warm_time'])
+    return points
+
+
+def find_crossovers(records):
+    """Find the problem sizes where a benchmark overtakes another one
+
+    The crossover size is interpolated on the log-log scaling curves of the
+    two benchmarks.
+    """
+    crossovers = []
+    swept = [r for r in records if r.get('sweep')]
+    for i, a in enumerate(swept):
+        times_a = dict((p['size'], p['warm_time']) for p in a['sweep'])
+        for b in swept[i + 1:]:
+            times_b = dict((p['size'], p['warm_time']) for p in b['sweep'])
+            sizes = sorted(s for s in set(times_a) & set(times_b)
+                           if times_a[s] > 0 and times_b[s] > 0)
+            for s0, s1 in zip(sizes[:-1], sizes[1:]):
+                d0 = np.log(times_a[s0] / times_b[s0])
+                d1 = np.log(times_a[s1] / times_b[s1])
+                if d0 * d1 >= 0:
+                    continue
+                t = d0 / (d0 - d1)
+                size = float(np.exp(np.log(s0) + t * np.log(float(s1) / s0)))
+                faster, slower = (a, b) if d1 < 0 else (b, a)
+                crossovers.append(OrderedDict([
+                    ('size', size),
+                    ('faster', faster['name']),
+                    ('slower', slower['name']),
+                ]))
+    crossovers.sort(key=lambda c: c['size'])
+    return crossovers
+
+
+def _format_error(name, source_url, e):
+    return OrderedDict([
+        ('name', name),
+        ('source_url', source_url),
+        ('error_type', type(e).__name__),
+        ('error_message', str(e)),
+        ('traceback', traceback.format_exc()),
+    ])
+
+
+def run_module_benchmarks(group_name, module_name, catch_errors=True,
+                          memory=True, sweep=False, sizes=None,
+                          sweep_time_limit=SWEEP_TIME_LIMIT, select=None,
+                          overhead=False):
+    """Import a single benchmark module and run all its benchmarks
+
+    This is the unit of work of the harness: it is either called directly
+    or from a worker process (see ``run_worker``).
+
+    When ``sweep`` is True, each benchmark is also run on the problem sizes
+    ``sizes`` (by default the ``sweep_sizes`` of the group) built by the
+    ``make_sweep_env`` function of the group.
+
+    When ``overhead`` is True, the per-call latency of each benchmark is
+    also measured on the tiny problem built by the ``make_small_env``
+    function of the group (see ``measure_call_overhead``).
+
+    Only the benchmarks matching the ``select`` patterns are run.
+
+    Every benchmark starts from the same inputs: they are restored from a
+    snapshot before each benchmark. Groups declaring ``mutating = True``
+    (benchmarks writing into their inputs) also get their inputs restored
+    before every timed call. The inputs of the other groups are checked
+    after each benchmark and a warning is logged when they were modified.
+    """
+    platform_name = module_name[len(group_name) + 1:]
+    group, = find_benchmarks(folders=[group_name], platforms=[platform_name],
+                             select=select)
+    make_env = group.get('make_env')
+    args, kwargs = make_env() if make_env is not None else ((), {})
+    snapshot = snapshot_inputs(args, kwargs)
+    restore = None
+    if group.get('mutating'):
+        restore = lambda: restore_inputs(snapshot)
+
+    make_sweep_env = group.get('make_sweep_env')
+    if sizes is None:
+        sizes = group.get('sweep_sizes')
+    if sweep and (make_sweep_env is None or not sizes):
+        log.warn("Group %s does not support size sweeps", group_name)
+        sweep = False
+
+    make_small_env = group.get('make_small_env')
+    if overhead and make_small_env is None:
+        log.warn("Group %s does not support call overhead measurements",
+                 group_name)
+        overhead = False
+    if overhead:
+        small_args, small_kwargs = make_small_env()
+        small_snapshot = snapshot_inputs(small_args, small_kwargs)
+        small_restore = None
+        if group.get('mutating'):
+            small_restore = lambda: restore_inputs(small_snapshot)
+
+    records = []
+    runtime_errors = []
+    for module_source, name, func in group['benchmarks']:
+        log.info("Benchmarking %s", name)
+        module_source_url = MODULE_URL_PATTERN % module_source
+        restore_inputs(snapshot)
+        try:
+            stats_before = artifact_cache.current_stats()
+            record = run_benchmark(
+                name, func, args, kwargs, memory=memory,
+                compile_hook=COMPILE_HOOKS.get(platform_name),
+                compile_times=group['compile_times'].get(name),
+                restore=restore)
+            if restore is None:
+                changed = inputs_changed(snapshot)
+                if changed:
+                    log.warn("%s modified its inputs %s: declare its group as"
+                             " mutating", name, changed)
+            record['source_url'] = module_source_url
+            record['import_time'] = group['import_times'].get(module_source)
+            # Whether the native code of the benchmark was built ('miss') or
+            # loaded from the artifact cache ('hit') at import or when
+            # running it
+            record['artifact_cache'] = _artifact_cache_status(
+                group['artifact_cache_stats'].get(module_source, {}),
+                _stats_delta(stats_before, artifact_cache.current_stats()))
+            metric = group['metrics'].get(name)
+            if metric is not None:
+                # Benchmark specific figures computed from the record and
+                # the inputs, e.g. the work saved by an algorithm
+                restore_inputs(snapshot)
+                record['metrics'] = OrderedDict(
+                    sorted(metric(record, args, kwargs).items()))
+            if overhead:
+                restore_inputs(small_snapshot)
+                try:
+                    median, p99, n_calls = measure_call_overhead(
+                        func, small_args, small_kwargs,
+                        restore=small_restore)
+                except Exception as e:
+                    # Some algorithms need a minimum problem size: keep the
+                    # rest of the record
+                    if not catch_errors:
+                        raise
+                    log.warn("Could not measure the call overhead of %s:"
+                             " %s: %s", name, type(e).__name__, e)
+                else:
+                    record['overhead_time'] = median
+                    record['overhead_p99_time'] = p99
+                    record['overhead_calls'] = n_calls
+                    log.info("%s: call overhead: median %s, p99 %s",
+                             name, median, p99)
+            if sweep:
+                points = run_sweep(name, func, make_sweep_env, sizes,
+                                   memory=memory,
+                                   time_limit=sweep_time_limit,
+                                   mutating=group.get('mutating'))
+                record['sweep'] = points
+                record['scaling_exponent'] = fit_scaling_exponent(
+                    [p['size'] for p in points],
+                    [p['warm_time'] for p in points])
+            records.append(record)
+            log.info("%s: cold: %s, warm: %s",
+                     name, record['cold_time'], record['warm_time'])
+        except Exception as e:
+            if catch_errors:
+                runtime_error = _format_error(name, module_source_url, e)
+                runtime_errors.append(runtime_error)
+                log.warn("Could not run %s: %s: %s", name,
+                         runtime_error['error_type'], e)
+                log.debug(runtime_error['traceback'])
+            else:
+                raise
+
+    return OrderedDict([
+        ('records', records),
+        ('runtime_errors', runtime_errors),
+        ('import_errors', group['import_errors']),
+    ])
+
+
+def run_worker(stdin=None, stdout=None):
+    """Serve ``run_module_benchmarks`` requests over a pipe
+
+    Each line read on ``stdin`` is a JSON object holding the keyword
+    arguments of a ``run_module_benchmarks`` call. The result is written back
+    as a single JSON line on ``stdout``.
+    """
+    stdin = sys.stdin if stdin is None else stdin
+    if stdout is None:
+        # Keep the protocol channel clean from whatever the benchmarked code
+        # writes to the standard output, including native code writing to
+        # the file descriptor directly (compilers, OpenCL builds...): talk
+        # over a duplicate of the descriptor, redirected to stderr
+        sys.stdout.flush()
+        stdout = os.fdopen(os.dup(1), 'w')
+        os.dup2(2, 1)
+    original_stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        for line in iter(stdin.readline, ''):
+            if not line.strip():
+                continue
+            request = json.loads(line)
+            pin_cpus(request.pop('cpus', None))
+            result = run_module_benchmarks(**request)
+            stdout.write(json.dumps(result) + '\n')
+            stdout.flush()
+    finally:
+        sys.stdout = original_stdout
+
+
+def run_module_in_subprocess(group_name, module_name, module_filename,
+                             interpreter=None, timeout=WORKER_TIMEOUT,
+                             log_level='INFO', cpus=None, **options):
+    """Run ``run_module_benchmarks`` in a fresh worker process
+
+    A crashing or wedged backend only costs the records of its own module:
+    the failure is reported as an error of that module.
+
+    When ``cpus`` is given, the worker is pinned to these cores and OpenMP
+    based backends are told to use as many threads as pinned cores.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    interpreter = interpreter or sys.executable
+    module_source_url = MODULE_URL_PATTERN % (
+        "%s/%s" % (group_name, module_filename))
+    result = OrderedDict([
+        ('records', []),
+        ('runtime_errors', []),
+        ('import_errors', []),
     ])
 
+    cmd = [interpreter, os.path.join(here, 'run_benchmarks.py'),
+           '--worker', '--log-level', log_level]
+    env = dict(os.environ)
+    if cpus:
+        env['OMP_NUM_THREADS'] = str(len(cpus))
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, cwd=here, env=env,
+                                universal_newlines=True)
+    except OSError as e:
+        log.error("Failed to start %s for %s: %s", interpreter,
+                  module_name, e)
+        result['import_errors'].append(
+            _format_error(module_name, module_source_url, e))
+        return result
+
+    request = dict(options, group_name=group_name, module_name=module_name,
+                   cpus=cpus)
+    killed = []
+
+    def kill():
+        killed.append(True)
+        proc.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    try:
+        out, _ = proc.communicate(json.dumps(request) + '\n')
+    finally:
+        timer.cancel()
+
+    lines = out.strip().splitlines()
+    if killed:
+        message = ("worker for %s was killed after %gs"
+                   % (module_name, timeout))
+    elif proc.returncode != 0 or not lines:
+        message = ("worker for %s exited with code %s"
+                   % (module_name, proc.returncode))
+    else:
+        try:
+            return json.loads(lines[-1])
+        except ValueError as e:
+            message = ("worker for %s sent an invalid result: %s"
+                       % (module_name, e))
+    log.error("%s", message)
+    result['runtime_errors'].append(OrderedDict([
+        ('name', module_name),
+        ('source_url', module_source_url),
+        ('error_type', 'WorkerError'),
+        ('error_message', message),
+        ('traceback', ''),
+    ]))
+    return result
+
+
+def library_version(name):
+    """Version of an installed distribution, without importing it"""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        try:
+            import pkg_resources
+            return pkg_resources.get_distribution(name).version
+        except Exception:
+            return None
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def environment_fingerprint():
+    """Describe the running interpreter and the key library versions"""
+    return OrderedDict([
+        ('python_implementation', platform.python_implementation()),
+        ('python_version', sys.version),
+        ('platform', platform.platform()),
+        ('processor', platform.processor()),
+        ('libraries', OrderedDict((name, library_version(name))
+                                  for name in KEY_LIBRARIES)),
+    ])
+
+
+_interpreter_fingerprints = {}
+
+
+def interpreter_fingerprint(interpreter=None):
+    """``environment_fingerprint`` of another interpreter, None on failure"""
+    if interpreter is None or interpreter == sys.executable:
+        return environment_fingerprint()
+    if interpreter not in _interpreter_fingerprints:
+        here = os.path.dirname(os.path.abspath(__file__))
+        cmd = [interpreter, os.path.join(here, 'run_benchmarks.py'),
+               '--fingerprint']
+        try:
+            out = subprocess.check_output(cmd, cwd=here,
+                                          universal_newlines=True)
+            fingerprint = json.loads(out)
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            fingerprint = None
+        _interpreter_fingerprints[interpreter] = fingerprint
+    return _interpreter_fingerprints[interpreter]
+
+
+_IMPORT_PATTERN = re.compile(
+    r'^\s*(?:from\s+([\w.]+)\s+)?c?import\s+([\w., ]+)', re.MULTILINE)
+
+
+def _local_source(dotted_name, here):
+    path = os.path.join(here, *dotted_name.split('.'))
+    for candidate in (path + '.py', path + '.pyx',
+                      os.path.join(path, '__init__.py')):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def module_dependencies(group_name, module_filename):
+    """List the local source files a benchmark module depends on
+
+    This includes the module itself, the ``__init__.py`` of its group and
+    the local modules it imports, recursively.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    pending = [os.path.join(here, group_name, '__init__.py'),
+               os.path.join(here, group_name, module_filename)]
+    dependencies = []
+    while pending:
+        path = pending.pop(0)
+        if path in dependencies:
+            continue
+        dependencies.append(path)
+        with open(path, 'rb') as f:
+            source = f.read().decode('utf-8', 'replace')
+        for package, names in _IMPORT_PATTERN.findall(source):
+            names = [n.split()[0] for n in names.split(',') if n.strip()]
+            if package:
+                names = [package] + ["%s.%s" % (package, n) for n in names]
+            for name in names:
+                local_source = _local_source(name, here)
+                if local_source is not None:
+                    pending.append(local_source)
+    return dependencies
+
+
+def module_cache_key(group_name, module_filename, interpreter=None,
+                     options=None):
+    """Hash everything the results of a benchmark module depend on
+
+    That is the sources of the module and of its local dependencies
+    (including the ``make_env`` of its group), the source of this script,
+    the interpreter and library versions and the options of the run.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha1()
+    for path in ([os.path.join(here, 'run_benchmarks.py')] +
+                 module_dependencies(group_name, module_filename)):
+        h.update(os.path.relpath(path, here).encode('utf-8'))
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    h.update(json.dumps([CACHE_VERSION, interpreter_fingerprint(interpreter),
+                         options], sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+def load_cache(cache_filename=CACHE_FILENAME):
+    if not os.path.exists(cache_filename):
+        return {}
+    with open(cache_filename, 'r') as f:
+        return json.load(f)
+
+
+def save_cache(cache, cache_filename=CACHE_FILENAME):
+    folder = os.path.dirname(cache_filename)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(cache_filename, 'w') as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+
+
+def available_cpus():
+    """List the CPU cores this process is allowed to run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+
+def split_cpus(n_jobs, cpus=None):
+    """Split the available cores into ``n_jobs`` disjoint contiguous sets."""
+    if cpus is None:
+        cpus = available_cpus()
+    n_jobs = max(1, min(n_jobs, len(cpus)))
+    chunk_size, extra = divmod(len(cpus), n_jobs)
+    cpu_sets = []
+    start = 0
+    for i in range(n_jobs):
+        stop = start + chunk_size + (1 if i < extra else 0)
+        cpu_sets.append(cpus[start:stop])
+        start = stop
+    return cpu_sets
+
+
+def pin_cpus(cpus):
+    """Restrict the current process to the given cores when supported."""
+    if cpus and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+
+def expected_durations(data_filename=DATA_FILENAME):
+    """Estimate the duration of each module from previous results
+
+    Returns a mapping from module source (e.g.
+    ``"pairwise/pairwise_python.py"``) to the total time spent running its
+    benchmarks.
+    """
+    durations = {}
+    if not os.path.exists(data_filename):
+        return durations
+    with open(data_filename, 'r') as f:
+        bench_data = json.load(f)
+
+    url_prefix = MODULE_URL_PATTERN % ''
+    for group in bench_data['benchmark_results']:
+        for record in group['records']:
+            module_source = record['source_url'][len(url_prefix):]
+            duration = ((record.get('cold_time') or 0.) +
+                        sum(record.get('all_warm_times', ())) *
+                        record.get('n_inner_calls', 1))
+            durations[module_source] = (durations.get(module_source, 0.) +
+                                        duration)
+    return durations
+
+
+def _confidence_interval(record):
+    return record.get('ci_warm_time') or (record['warm_time'],
+                                          record['warm_time'])
+
+
+def rank_records(records):
+    """Rerank records by ascending warm time
+
+    Records whose confidence interval overlaps the one of any record of a
+    rank share that rank. The speedup with respect to the slowest record
+    is only reported (not None) when the confidence intervals of both records
+    do not overlap.
+    """
+    if len(records) == 0:
+        return
+    records.sort(key=lambda r: r['warm_time'])
+    # Highest upper bound of the confidence intervals of the current rank
+    rank_upper = None
+    for i, record in enumerate(records):
+        lower, upper = _confidence_interval(record)
+        if rank_upper is None or rank_upper < lower:
+            rank = i + 1  # start at 1 instead of 0
+            rank_upper = upper
+        else:
+            rank_upper = max(rank_upper, upper)
+        record['rank'] = rank
+
+    slowest = records[-1]
+    for record in records:
+        if record is slowest:
+            record['speedup'] = 1.
+        elif (_confidence_interval(record)[1] <
+                _confidence_interval(slowest)[0]):
+            record['speedup'] = slowest['warm_time'] / record['warm_time']
+        else:
+            record['speedup'] = None
+
 
 def run_benchmarks(folders=None, platforms=None, catch_errors=True,
-                   memory=True):
-    collected = find_benchmarks(folders=folders, platforms=platforms)
+                   memory=True, isolate=False, interpreters=None,
+                   timeout=WORKER_TIMEOUT, log_level='INFO', n_jobs=1,
+                   data_filename=DATA_FILENAME, sweep=False, sizes=None,
+                   sweep_time_limit=SWEEP_TIME_LIMIT, cache=None,
+                   select=None, overhead=False):
+    """Run all the benchmarks and collect the results by group
 
-    bench_results = []
+    When ``isolate`` is True, each module is run in its own worker process.
+    Modules of a platform listed in ``interpreters`` are always run in a
+    worker process using the matching interpreter (e.g. PyPy).
 
-    for group in collected:
-        log.info("Running benchmark group %s", group['name'])
-        make_env = group.get('make_env')
-        args, kwargs = make_env() if make_env is not None else ((), {})
+    When ``n_jobs`` > 1, modules are run by ``n_jobs`` concurrent worker
+    processes, each pinned to its own disjoint set of cores. Modules are
+    scheduled longest first according to the durations recorded in
+    ``data_filename``, modules without any history going first.
 
-        records = []
-        runtime_errors = []
-        for module_source, name, func in group['benchmarks']:
-            log.info("Benchmarking %s", name)
-            module_source_url = MODULE_URL_PATTERN % module_source
-            try:
-                record = run_benchmark(name, func, args, kwargs, memory=memory)
-                record['source_url'] = module_source_url
-                records.append(record)
-                log.info("%s: cold: %s, warm: %s",
-                         name, record['cold_time'], record['warm_time'])
-            except Exception as e:
-                if catch_errors:
-                    error_type = type(e).__name__
-                    error_message = str(e)
-                    tb = traceback.format_exc()
-                    runtime_error = OrderedDict([
-                        ('name', name),
-                        ('source_url', module_source_url),
-                        ('error_type', error_type),
-                        ('error_message', error_message),
-                        ('traceback', tb),
+    See ``run_module_benchmarks`` for the ``sweep``, ``select`` and
+    ``overhead`` options.
+
+    ``cache`` is a dict of previous results by module source, as loaded by
+    ``load_cache``. Modules whose ``module_cache_key`` did not change are
+    not run again. The cache is updated in place with the new results.
+    """
+    if interpreters is None:
+        interpreters = DEFAULT_INTERPRETERS
+    collected = find_benchmark_modules(folders=folders, platforms=platforms,
+                                       select=select)
+
+    tasks = [(group_name,) + module_info
+             for group_name, group_modules in collected.items()
+             for module_info in group_modules]
+    results = {}
+    module_options = dict(catch_errors=catch_errors, memory=memory,
+                          sweep=sweep, sizes=sizes,
+                          sweep_time_limit=sweep_time_limit,
+                          select=select, overhead=overhead)
+
+    def run_task(task, cpus=None):
+        group_name, module_name, platform_name, module_filename = task
+        interpreter = interpreters.get(platform_name)
+        if cache is not None:
+            module_source = "%s/%s" % (group_name, module_filename)
+            key = module_cache_key(group_name, module_filename,
+                                   interpreter=interpreter,
+                                   options=module_options)
+            cached = cache.get(module_source)
+            if cached is not None and cached['key'] == key:
+                log.info("Using cached results for %s", module_source)
+                results[group_name, module_name] = cached['result']
+                return
+        if isolate or cpus is not None or interpreter is not None:
+            result = run_module_in_subprocess(
+                group_name, module_name, module_filename,
+                interpreter=interpreter, timeout=timeout,
+                log_level=log_level, cpus=cpus, **module_options)
+        else:
+            result = run_module_benchmarks(group_name, module_name,
+                                           **module_options)
+        results[group_name, module_name] = result
+        # Runtime errors may be transient (crashed or killed worker,
+        # exhausted memory...): only cache the results without any
+        if cache is not None and not result['runtime_errors']:
+            cache[module_source] = OrderedDict([
+                ('key', key),
+                ('result', json.loads(json.dumps(result))),
+            ])
+
+    if n_jobs > 1:
+        durations = expected_durations(data_filename)
+
+        def expected_duration(task):
+            module_source = "%s/%s" % (task[0], task[3])
+            return durations.get(module_source, float('inf'))
+
+        task_queue = Queue()
+        for task in sorted(tasks, key=expected_duration, reverse=True):
+            task_queue.put(task)
+
+        def consume(cpus):
+            while True:
+                try:
+                    task = task_queue.get_nowait()
+                except Empty:
+                    return
+                try:
+                    run_task(task, cpus=cpus)
+                except Exception as e:
+                    # Keep consuming: the failure only costs the results of
+                    # this module
+                    group_name, module_name, _, module_filename = task
+                    log.error("Failed to run %s: %s: %s", module_name,
+                              type(e).__name__, e)
+                    results[group_name, module_name] = OrderedDict([
+                        ('records', []),
+                        ('runtime_errors', [_format_error(
+                            module_name, MODULE_URL_PATTERN % (
+                                "%s/%s" % (group_name, module_filename)),
+                            e)]),
+                        ('import_errors', []),
                     ])
-                    runtime_errors.append(runtime_error)
-                    log.warn("Could not run %s: %s: %s", name,
-                             error_type, e)
-                    log.debug(tb)
-                else:
-                    raise
 
-            # TODO: add special support for PyPy with a sub-process
+        threads = [threading.Thread(target=consume, args=(cpus,))
+                   for cpus in split_cpus(n_jobs)]
+        log.info("Running %d modules with %d jobs", len(tasks), len(threads))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        for task in tasks:
+            run_task(task)
 
-        # Rerank records by ascending warm time:
-        if len(records) > 0:
-            records.sort(key=lambda r: r['warm_time'])
-            slowest_time = records[-1]['warm_time']
-            for rank, record in enumerate(records):
-                record['rank'] = rank + 1  # start at 1 instead of 0
-                record['speedup'] = slowest_time / record['warm_time']
+    bench_results = []
+
+    for group_name, group_modules in collected.items():
+        records = []
+        runtime_errors = []
+        import_errors = []
+        for module_name, _, _ in group_modules:
+            result = results[group_name, module_name]
+            records.extend(result['records'])
+            runtime_errors.extend(result['runtime_errors'])
+            import_errors.extend(result['import_errors'])
+
+        rank_records(records)
 
         bench_results.append(OrderedDict([
-            ('group_name', group['name']),
-            ('source_url', GROUP_URL_PATTERN % group['name']),
+            ('group_name', group_name),
+            ('source_url', GROUP_URL_PATTERN % group_name),
             ('records', records),
             ('runtime_errors', runtime_errors),
-            ('import_errors', group['import_errors']),
+            ('import_errors', import_errors),
         ]))
+        if sweep:
+            bench_results[-1]['crossovers'] = find_crossovers(records)
     return bench_results
 
 
 def plot_group(group, width=0.5, zoom_scale=None, log_scale=False,
                figsize=(12, 6), folder="report/images"):
+    # Plotting and report rendering dependencies are not needed by workers
+    import matplotlib.pyplot as plt
+
     records = group['records']
     if len(records) == 0:
         return
@@ -294,12 +1487,44 @@ def plot_group(group, width=0.5, zoom_scale=None, log_scale=False,
     group.setdefault('plot_filenames', []).append(filename)
 
 
+def plot_sweep(group, figsize=(12, 6), folder="report/images"):
+    import matplotlib.pyplot as plt
+
+    records = [r for r in group['records'] if r.get('sweep')]
+    if len(records) == 0:
+        return
+
+    name = group['group_name']
+    plt.figure(figsize=figsize)
+    for r in records:
+        sizes = [p['size'] for p in r['sweep']]
+        times = [p['warm_time'] for p in r['sweep']]
+        label = r['name'][len(name) + 1:]
+        if r.get('scaling_exponent') is not None:
+            label += " (%0.2f)" % r['scaling_exponent']
+        plt.loglog(sizes, times, marker='o', label=label)
+
+    plt.title("%s (scaling with problem size)" % name)
+    plt.xlabel('Problem size')
+    plt.ylabel('Time (s)')
+    plt.legend(loc='upper left', fontsize='small')
+
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    filename = "%s_sweep.png" % name
+    plt.savefig(os.path.join(folder, filename))
+    group.setdefault('plot_filenames', []).append(filename)
+
+
 def build_report(bench_data, report_filename=REPORT_FILENAME,
                  data_filename=DATA_FILENAME):
+    from jinja2 import Template
+
     for group in bench_data['benchmark_results']:
         plot_group(group, zoom_scale=5, log_scale=False)
         plot_group(group, zoom_scale=None, log_scale=True)
-    with open(MAIN_REPORT_TEMPLATE_FILENAME, 'rb') as f:
+        plot_sweep(group)
+    with open(MAIN_REPORT_TEMPLATE_FILENAME, 'r') as f:
         rendered = Template(f.read()).render(
             bench_results=bench_data['benchmark_results'],
             bech_env=bench_data['benchmark_environment'],
@@ -315,7 +1540,7 @@ def build_report(bench_data, report_filename=REPORT_FILENAME,
         )
     report_filename = 'report/index.html'
     log.info("Writing report to: %s", report_filename)
-    with open(report_filename, 'wb') as f:
+    with open(report_filename, 'w') as f:
         f.write(rendered)
 
 
@@ -323,39 +1548,136 @@ def parse_args(args):
     parser = argparse.ArgumentParser()
     parser.add_argument('--no-catch-errors', action='store_true',
                         default=False)
+    parser.add_argument('--no-memory', action='store_true', default=False,
+                        help="Do not measure the memory usage of the "
+                        "benchmarks, which takes extra calls.")
     parser.add_argument('--folders', nargs='*', default=None)
     parser.add_argument('--platforms', nargs='*', default=None)
-    parser.add_argument('--ignore-data', action='store_true', default=False)
+    parser.add_argument('--select', nargs='*', default=None,
+                        metavar='PATTERN',
+                        help="Only run the benchmarks whose name matches "
+                        "one of these shell-style patterns.")
+    parser.add_argument('--list', action='store_true', default=False,
+                        help="List the benchmarks without running them.")
+    parser.add_argument('--ignore-data', action='store_true', default=False,
+                        help="Run all the benchmarks again instead of "
+                        "reusing the cached results of unchanged modules.")
+    parser.add_argument('--report-only', action='store_true', default=False,
+                        help="Only rebuild the report from the collected "
+                        "data.")
     parser.add_argument('--log-level', default='INFO')
     parser.add_argument('--open-report', action='store_true',
                         default=False)
+    parser.add_argument('--isolate', action='store_true', default=False,
+                        help="Run each module in its own worker process.")
+    parser.add_argument('--interpreters', nargs='*', default=[],
+                        metavar='PLATFORM=PATH',
+                        help="Interpreter used to run the modules of a "
+                        "platform, e.g. pypy=/opt/pypy/bin/pypy.")
+    parser.add_argument('--timeout', type=float, default=WORKER_TIMEOUT,
+                        help="Maximum duration in seconds of a worker "
+                        "process.")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help="Number of modules run concurrently, each in "
+                        "a worker process pinned to its own cores.")
+    parser.add_argument('--sweep', action='store_true', default=False,
+                        help="Also run each benchmark on the range of "
+                        "problem sizes of its group.")
+    parser.add_argument('--sizes', nargs='*', type=int, default=None,
+                        help="Problem sizes of the sweep (implies --sweep).")
+    parser.add_argument('--sweep-time-limit', type=float,
+                        default=SWEEP_TIME_LIMIT,
+                        help="Skip sweep sizes expected to take longer "
+                        "than this number of seconds per call.")
+    parser.add_argument('--overhead', action='store_true', default=False,
+                        help="Also measure the per-call latency of each "
+                        "benchmark on the tiny problem of its group.")
+    parser.add_argument('--worker', action='store_true', default=False,
+                        help=argparse.SUPPRESS)
+    parser.add_argument('--fingerprint', action='store_true', default=False,
+                        help=argparse.SUPPRESS)
     return parser.parse_args(args)
 
+
+def list_benchmarks(folders=None, platforms=None, select=None):
+    """Print the benchmarks of each module without importing them"""
+    collected = find_benchmark_modules(folders=folders, platforms=platforms,
+                                       select=select)
+    for group_name, group_modules in collected.items():
+        print(group_name)
+        for module_name, platform_name, module_filename in group_modules:
+            names = scan_benchmarks(os.path.join(group_name, module_filename))
+            print("  %s" % module_filename)
+            for name in names:
+                if is_runtime_label(name):
+                    print("    %s (name known at import)" % name)
+                elif match_benchmark(name, select):
+                    print("    %s" % name)
+
+
+def parse_interpreters(specs):
+    interpreters = dict(DEFAULT_INTERPRETERS)
+    for spec in specs:
+        platform_name, sep, path = spec.partition('=')
+        if not sep:
+            raise ValueError("Invalid interpreter specification %r, "
+                             "expected PLATFORM=PATH" % spec)
+        interpreters[platform_name] = path
+    return interpreters
+
+
 if __name__ == "__main__":
-    import sys
     options = parse_args(sys.argv[1:])
 
     log_level = getattr(logging, options.log_level.upper(), logging.INFO)
     logging.basicConfig(level=log_level, format=LOG_FORMAT)
 
+    if options.worker:
+        run_worker()
+        sys.exit(0)
+
+    if options.fingerprint:
+        print(json.dumps(environment_fingerprint()))
+        sys.exit(0)
+
+    if options.list:
+        list_benchmarks(folders=options.folders, platforms=options.platforms,
+                        select=options.select)
+        sys.exit(0)
+
     bench_data_filename = DATA_FILENAME
-    if os.path.exists(bench_data_filename) and not options.ignore_data:
+    if os.path.exists(bench_data_filename) and options.report_only:
         log.info("Loading bench data from: %s", bench_data_filename)
-        with open(bench_data_filename, 'rb') as f:
+        with open(bench_data_filename, 'r') as f:
             bench_data = json.load(f)
     else:
+        cache = {} if options.ignore_data else load_cache(CACHE_FILENAME)
         bench_results = run_benchmarks(
             catch_errors=not options.no_catch_errors,
+            memory=not options.no_memory,
             folders=options.folders,
             platforms=options.platforms,
+            isolate=options.isolate,
+            interpreters=parse_interpreters(options.interpreters),
+            timeout=options.timeout,
+            log_level=options.log_level,
+            n_jobs=options.jobs,
+            sweep=options.sweep or bool(options.sizes),
+            sizes=options.sizes,
+            sweep_time_limit=options.sweep_time_limit,
+            cache=cache,
+            select=options.select,
+            overhead=options.overhead,
         )
-        bench_environment = {}  # TODO
+        log.info("Writing cached results to: %s", CACHE_FILENAME)
+        save_cache(cache, CACHE_FILENAME)
+        bench_environment = environment_fingerprint()
         bench_data = OrderedDict([
             ('benchmark_results', bench_results),
             ('benchmark_environment', bench_environment),
         ])
         log.info("Writing bench data to: %s", bench_data_filename)
-        with open(bench_data_filename, 'wb') as f:
+        with open(bench_data_filename, 'w') as f:
             json.dump(bench_data, f, indent=2)
     report_filename = os.path.abspath('report/index.html')
     build_report(bench_data, data_filename=bench_data_filename,
@@ -0,0 +1,42 @@
+# License: MIT
+"""Pools of worker processes shared by the multiprocessing benchmarks
+
+The pools are started on first use and kept across calls, so that the
+benchmarks measure their computation rather than the start of the worker
+processes. By default they are sized from the cores this process is allowed
+to run on, which ``run_benchmarks.py --jobs`` restricts, and they are
+stopped at exit.
+"""
+import atexit
+import multiprocessing
+import os
+
+# Pools by number of processes
+_pools = {}
+
+
+def available_cores():
+    """Number of CPU cores this process is allowed to run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return multiprocessing.cpu_count()
+
+
+def get_pool(processes=None):
+    """The shared pool of ``processes`` processes, by default one per
+    available core"""
+    if processes is None:
+        processes = available_cores()
+    if processes not in _pools:
+        if not _pools:
+            atexit.register(close_pools)
+        _pools[processes] = multiprocessing.Pool(processes)
+    return _pools[processes]
+
+
+def close_pools():
+    """Stop the worker processes of the shared pools"""
+    for pool in _pools.values():
+        pool.close()
+        pool.join()
+    _pools.clear()